@@ -4,7 +4,6 @@ import os
 import json
 import asyncio
 import logging
-from datetime import datetime
 from typing import Dict, Any, Literal, Optional
 
 import google.generativeai as genai
@@ -17,6 +16,12 @@ logger = logging.getLogger(__name__)
 API_KEY = os.getenv("GEMINI_API_KEY")
 MODEL_NAME = os.getenv("SINGLE_MODEL_NAME", "gemini-2.5-flash")
 
+# Canned replies returned instead of model output; callers must not persist these
+UNAVAILABLE_RESPONSE = "AI service is currently unavailable."
+EMPTY_RESPONSE = "No response generated."
+ERROR_RESPONSE = "An error occurred while generating the response."
+FALLBACK_RESPONSES = frozenset({UNAVAILABLE_RESPONSE, EMPTY_RESPONSE, ERROR_RESPONSE})
+
 if API_KEY:
     genai.configure(api_key=API_KEY)
 else:
@@ -55,7 +60,7 @@ class MedicalChatbot:
         """
 
         if not self.model:
-            return "AI service is currently unavailable."
+            return UNAVAILABLE_RESPONSE
 
         if actor == "doctor" and mode == "general":
             return await self._doctor_general(query, actor_profile)
@@ -160,10 +165,10 @@ Patient Question:
                 self.model.generate_content,
                 prompt
             )
-            return response.text.strip() if response and response.text else "No response generated."
+            return response.text.strip() if response and response.text else EMPTY_RESPONSE
         except Exception as e:
             logger.error(f"AI generation error: {e}")
-            return "An error occurred while generating the response."
+            return ERROR_RESPONSE
 
     async def summarize_medical_record(self, patient_data: dict) -> str:
         prompt = f"""
@@ -176,6 +181,22 @@ Highlight:
 
 Record:
 {json.dumps(patient_data, indent=2, default=str)}
+"""
+        return await self._run(prompt)
+
+    async def summarize_report_text(self, report_text: str) -> str:
+        if not self.model:
+            return UNAVAILABLE_RESPONSE
+
+        prompt = f"""
+Summarize this medical report in simple language.
+Highlight:
+- Key findings
+- Abnormal values
+- Suggested follow-up
+
+Report:
+{report_text}
 """
         return await self._run(prompt)
 
@@ -1,7 +1,7 @@
 # ai_core/parser_service.py
 
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any
 from .chatbot_service import MedicalChatbot # Assuming in the same directory
 import json
 from datetime import datetime
@@ -0,0 +1,22 @@
+# ai_core/transcription_service.py
+
+import os
+
+# Single Whisper instance shared by every router (loading it per module
+# duplicated the weights in memory and the startup cost).
+try:
+    from faster_whisper import WhisperModel
+    import torch
+    WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "tiny")
+    WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cuda" if torch.cuda.is_available() else "cpu")
+    WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "float16" if WHISPER_DEVICE == "cuda" else "int8")
+    # CTranslate2 defaults to 4 intra-op threads on CPU; use all cores unless overridden
+    WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", os.cpu_count() or 4))
+    whisper_model = WhisperModel(
+        WHISPER_MODEL_SIZE,
+        device=WHISPER_DEVICE,
+        compute_type=WHISPER_COMPUTE_TYPE,
+        cpu_threads=WHISPER_CPU_THREADS
+    )
+except ImportError:
+    whisper_model = None
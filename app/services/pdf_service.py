@@ -0,0 +1,151 @@
+# app/services/pdf_service.py
+
+import io
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import fitz # PyMuPDF
+from fpdf import FPDF
+
+# CPU-bound PDF work (parsing / rendering) runs here instead of the default
+# thread pool, so it neither holds the GIL nor starves other request handlers.
+# Spawn context keeps the workers free of the parent's event loop & Mongo client.
+def _new_cpu_pool() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+cpu_pool = _new_cpu_pool()
+_cpu_pool_lock = threading.Lock()
+
+async def run_in_cpu_pool(fn, *args):
+    """
+    Runs fn(*args) on the process pool. A worker that dies (OOM kill, MuPDF crash)
+    breaks the whole executor for good, so a broken pool is replaced once and the
+    call retried on the new one.
+    """
+    global cpu_pool
+    loop = asyncio.get_running_loop()
+    pool = cpu_pool
+    try:
+        return await loop.run_in_executor(pool, fn, *args)
+    except BrokenProcessPool:
+        with _cpu_pool_lock:
+            # Concurrent callers saw the same broken pool; only the first replaces it
+            if cpu_pool is pool:
+                cpu_pool = _new_cpu_pool()
+                pool.shutdown(wait=False)
+        return await loop.run_in_executor(cpu_pool, fn, *args)
+
+# PDFs above this many pages are split across several pool workers; below it
+# the IPC round-trips cost more than the single-worker parse.
+PARALLEL_PAGE_THRESHOLD = 8
+PARALLEL_PAGE_WORKERS = min(os.cpu_count() or 1, 4)
+
+# Plain "text" mode; ligatures are expanded (no TEXT_PRESERVE_LIGATURES), which is
+# also what the summarizer wants. TEXT_INHIBIT_SPACES is avoided: it glues words.
+TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+def _open_pdf(source):
+    if isinstance(source, str):
+        return fitz.open(source, filetype="pdf")
+    return fitz.open(stream=source, filetype="pdf")
+
+def _pages_text(doc, start: int, stop: int) -> str:
+    out = io.StringIO()
+    for i in range(start, stop):
+        out.write(doc.load_page(i).get_text("text", flags=TEXT_FLAGS))
+    return out.getvalue()
+
+def extract_text(source, content_type: str) -> str:
+    """
+    Extracts plain text from an uploaded PDF or text file.
+    `source` is either the raw bytes or the path of a spooled temp file;
+    paths let MuPDF read the file directly instead of copying it into memory.
+    """
+    if content_type == 'application/pdf':
+        with _open_pdf(source) as doc:
+            return _pages_text(doc, 0, doc.page_count)
+    if content_type == 'text/plain':
+        if isinstance(source, str):
+            with open(source, encoding='utf-8') as f:
+                return f.read()
+        return source.decode('utf-8')
+    return ""
+
+def extract_small_pdf(source) -> tuple[str | None, int]:
+    """
+    Opens the PDF once: returns (text, page_count) when it is small enough for a
+    single worker, or (None, page_count) so the caller can split it.
+    """
+    with _open_pdf(source) as doc:
+        if doc.page_count <= PARALLEL_PAGE_THRESHOLD:
+            return _pages_text(doc, 0, doc.page_count), doc.page_count
+        return None, doc.page_count
+
+def extract_page_range(source, start: int, stop: int) -> str:
+    """Text of pages [start, stop) — one slice of a parallel extraction."""
+    with _open_pdf(source) as doc:
+        return _pages_text(doc, start, stop)
+
+async def extract_text_async(source, content_type: str) -> str:
+    """
+    Runs `extract_text` on the process pool; large PDFs are split into
+    contiguous page ranges parsed by several workers at once.
+    """
+    if content_type != 'application/pdf':
+        return await run_in_cpu_pool(extract_text, source, content_type)
+
+    # Small files (the common case) are parsed in this same single hop
+    text, page_count = await run_in_cpu_pool(extract_small_pdf, source)
+    if text is not None:
+        return text
+
+    step = -(-page_count // PARALLEL_PAGE_WORKERS)  # ceil division
+    parts = await asyncio.gather(*(
+        run_in_cpu_pool(extract_page_range, source, start, min(start + step, page_count))
+        for start in range(0, page_count, step)
+    ))
+    return "".join(parts)
+
+# Unicode TTF used for report PDFs (µ, °, greek letters...). Without it we fall
+# back to the latin-1-only core Arial font.
+# PDF_FONT_PATH wins; otherwise use the first DejaVu install found on the host.
+_FONT_CANDIDATES = (
+    os.getenv("PDF_FONT_PATH", "fonts/DejaVuSans.ttf"),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",  # Debian / Ubuntu
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",  # Fedora / Alpine
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",  # Arch
+)
+PDF_FONT_PATH = next((path for path in _FONT_CANDIDATES if os.path.isfile(path)), None)
+UNICODE_FONT = PDF_FONT_PATH is not None
+
+def to_latin1(text: str) -> str:
+    """Core fonts are latin-1 only; unsupported characters become '?'."""
+    # isascii() is O(1) on CPython and most reports are plain ASCII
+    if text.isascii():
+        return text
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+def generate_fpdf(content: str) -> bytes:
+    """Renders text content to PDF and returns the document bytes."""
+    # A fresh FPDF (and font registration) per render: output() subsets the TTF
+    # font object in place, so fonts must never be shared between documents.
+    # Re-registering is not the waste it looks like: the tables add_font decodes
+    # (cmap, hmtx, post) are the ones the subsetter needs on every fresh font.
+    pdf = FPDF()
+    if UNICODE_FONT:
+        pdf.add_font("DejaVu", "", PDF_FONT_PATH)
+        pdf.set_font("DejaVu", size=12)
+    else:
+        pdf.set_font("Arial", size=12)
+    pdf.add_page()
+    pdf_text = content if UNICODE_FONT else to_latin1(content)
+    pdf.multi_cell(0, 10, pdf_text)
+    # fpdf2's output() with no path returns the document as a bytearray
+    return bytes(pdf.output())
@@ -11,7 +11,16 @@ if not MONGO_URI:
     raise ValueError("MONGO_URI not found in .env file.")
 
 
-client = AsyncIOMotorClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+# Connection pool sized explicitly (driver default is maxPoolSize=100, minPoolSize=0);
+# a request that can't get a connection within waitQueueTimeoutMS fails fast.
+client = AsyncIOMotorClient(
+    MONGO_URI,
+    maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", 200)),
+    minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", 20)),
+    waitQueueTimeoutMS=int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000)),
+    serverSelectionTimeoutMS=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+    retryWrites=True
+)
 
 db = client.aarogyadb 
 user_collection = db.users
@@ -23,4 +32,31 @@ appointments_collection = db.appointments
 medical_records_collection = db.medical_records
 report_contents_collection = db.report_contents 
 instant_meetings_collection = db.instant_meetings
-notifications_collection = db.notifications
\ No newline at end of file
+notifications_collection = db.notifications
+
+async def ping():
+    """Round-trip to the server at startup: connects the pool before the first request."""
+    await client.admin.command("ping")
+
+async def init_indexes():
+    """Creates the indexes backing the hot query shapes. Safe to call on every startup."""
+    await reports_collection.create_index([("owner_email", 1), ("upload_date", -1)], background=True)
+    await user_collection.create_index("aarogya_id", unique=True, background=True)
+    await user_collection.create_index("email", unique=True, background=True)
+    await medical_records_collection.create_index("patient_id", unique=True, background=True)
+    await report_contents_collection.create_index("text_sha256", background=True)
+    await report_contents_collection.create_index("sha256", unique=True, sparse=True, background=True)
+    # Sessions are looked up by the sha256 of the cookie token. Partial, so older
+    # raw-token sessions (no token_hash) don't block startup before migrate.py runs
+    await sessions_collection.create_index(
+        "token_hash", unique=True, partialFilterExpression={"token_hash": {"$exists": True}}, background=True
+    )
+    # TTL index: MongoDB deletes sessions once expires_at passes (BSON dates only)
+    await sessions_collection.create_index("expires_at", expireAfterSeconds=0, background=True)
+    await chat_messages_collection.create_index([("owner_email", 1), ("patient_id", 1), ("timestamp", 1)], background=True)
+    await notifications_collection.create_index([("user_id", 1), ("timestamp", -1)], background=True)
+    await appointments_collection.create_index([("doctor_email", 1), ("status", 1), ("timestamp", 1)], background=True)
+    await appointments_collection.create_index([("patient_email", 1), ("appointment_time", -1)], background=True)
+    await connection_requests_collection.create_index([("patient_email", 1), ("status", 1), ("timestamp", -1)], background=True)
+    await instant_meetings_collection.create_index([("doctor_id", 1), ("status", 1), ("created_at", -1)], background=True)
+    await user_collection.create_index([("user_type", 1), ("is_public", 1), ("is_authorized", 1)], background=True)
@@ -1,8 +1,12 @@
 # main.py
 
+import asyncio
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles 
-from fastapi.templating import Jinja2Templates
+
+from database import init_indexes, ping
+from security import last_active_flusher, flush_last_active
+from responses import BSONJSONResponse
 
 # Routes
 from routes import (
@@ -21,10 +25,21 @@ app = FastAPI(
     title="AarogyaAI",
     description="Medical AI Assistant",
     version="0.1.0",
+    default_response_class=BSONJSONResponse,
 )
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+
+@app.on_event("startup")
+async def on_startup():
+    await ping()
+    await init_indexes()
+    app.state.last_active_flusher = asyncio.create_task(last_active_flusher())
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    app.state.last_active_flusher.cancel()
+    await flush_last_active()
 
 # Include all routers
 app.include_router(ui_routes.router, prefix="", tags=["UI"])
@@ -0,0 +1,43 @@
+# migrate.py
+# One-off data migrations, kept out of the app's startup path. Run once after
+# upgrading, before starting the new app version:  python migrate.py
+# Every step is idempotent, so running it again is harmless.
+
+import asyncio
+from pymongo import UpdateOne
+
+from database import reports_collection, report_contents_collection, sessions_collection
+
+async def backfill_content_ref_counts():
+    """Gives report_contents documents the number of reports referencing them."""
+    counts = reports_collection.aggregate([
+        # content_id is a hex string on older reports, an ObjectId on newer ones
+        {"$group": {
+            "_id": {"$convert": {"input": "$content_id", "to": "objectId", "onError": None, "onNull": None}},
+            "refs": {"$sum": 1}
+        }},
+        {"$match": {"_id": {"$ne": None}}},
+    ])
+    ops = [
+        UpdateOne({"_id": c["_id"], "ref_count": {"$exists": False}}, {"$set": {"ref_count": c["refs"]}})
+        async for c in counts
+    ]
+    if ops:
+        result = await report_contents_collection.bulk_write(ops, ordered=False)
+        print(f"report_contents: set ref_count on {result.modified_count} documents")
+
+async def drop_raw_token_sessions():
+    """
+    Sessions are now stored by token hash. Older ones kept the raw token and
+    can't be resolved any more (their users log in again). They also carry
+    ISO-string timestamps, which the expires_at TTL index never expires.
+    """
+    result = await sessions_collection.delete_many({"token_hash": {"$exists": False}})
+    print(f"sessions: removed {result.deleted_count} raw-token sessions")
+
+async def main():
+    await backfill_content_ref_counts()
+    await drop_raw_token_sessions()
+
+if __name__ == "__main__":
+    asyncio.run(main())
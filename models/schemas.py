@@ -1,10 +1,23 @@
 # models/schemas.py
 
-from pydantic import BaseModel, Field
-from typing import List, Optional, Literal, Any
+from pydantic import BaseModel, Field, BeforeValidator, AfterValidator, PlainSerializer, WithJsonSchema
+from typing import List, Optional, Literal, Annotated
 from datetime import datetime, timedelta, timezone 
 from bson import ObjectId
-import secrets
+from functools import cached_property
+
+# ObjectId kept native in Python and Mongo (12 bytes, no hex parsing on reads);
+# accepts hex strings on input and is rendered as a hex string in JSON.
+PyObjectId = Annotated[
+    ObjectId,
+    BeforeValidator(lambda v: ObjectId(v) if isinstance(v, str) and ObjectId.is_valid(v) else v),
+    PlainSerializer(str, return_type=str, when_used="json"),
+    WithJsonSchema({"type": "string"}),
+]
+
+# Mongo hands datetimes back naive (in UTC); pin them to UTC so they compare
+# with datetime.now(timezone.utc).
+UTCDatetime = Annotated[datetime, AfterValidator(lambda d: d if d.tzinfo else d.replace(tzinfo=timezone.utc))]
 
 # --- 1. Session Management Schemas ---
 SESSION_COOKIE_NAME = "session_token"
@@ -12,12 +25,12 @@ SESSION_EXPIRATION_MINUTES = 1440
 
 class UserSession(BaseModel):
     id: Optional[str] = Field(default=None, alias="_id")
-    token: str
+    token_hash: str # sha256 hex of the cookie token; the raw token is never stored
     user_id: str
     user_type: str
-    login_time: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    last_active: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    expires_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc) + timedelta(minutes=SESSION_EXPIRATION_MINUTES))
+    login_time: UTCDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    last_active: UTCDatetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    expires_at: UTCDatetime = Field(default_factory=lambda: datetime.now(timezone.utc) + timedelta(minutes=SESSION_EXPIRATION_MINUTES))
 
     # V2 Configuration
     model_config = {
@@ -107,12 +120,13 @@ class Report(BaseModel):
     filename: str
     upload_date: datetime = Field(default_factory=datetime.utcnow)
     owner_email: str
-    content_id: Optional[str] = None 
+    content_id: Optional[PyObjectId] = None 
     report_type: Optional[str] = None
     description: Optional[str] = None 
 
     model_config = {
-        "populate_by_name": True
+        "populate_by_name": True,
+        "arbitrary_types_allowed": True
     }
 
 class MedicalRecord(BaseModel):
@@ -138,7 +152,7 @@ class MedicalRecord(BaseModel):
 class User(BaseModel):
     id: Optional[str] = Field(alias="_id", default=None)
     email: str
-    hashed_password: str
+    hashed_password: Optional[str] = None # not loaded for authenticated-user lookups
     aarogya_id: str
     user_type: str
     patient_list: List[str] = [] 
@@ -168,6 +182,12 @@ class User(BaseModel):
         "populate_by_name": True
     }
 
+    @cached_property
+    def user_json(self) -> str:
+        """Client-side JSON for the user (templates' `user_json`, /users/me); serialized once per instance."""
+        # The password hash never goes to the browser
+        return self.model_dump_json(by_alias=True, exclude={"hashed_password"})
+
 class UserCreate(BaseModel):
     email: str
     password: str
@@ -0,0 +1,21 @@
+# responses.py
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+class BSONJSONResponse(ORJSONResponse):
+    """
+    orjson response that also understands BSON types: ObjectId (and anything
+    else orjson can't encode natively) is rendered with str().
+
+    As the app's default_response_class it only does the final orjson encode:
+    for plain dict/model return values FastAPI still runs jsonable_encoder
+    first, which must already be able to handle every value. The str() fallback
+    applies when a route returns BSONJSONResponse(...) itself, which is how the
+    report list routes hand raw Mongo documents over without a stringify pass.
+    """
+
+    def render(self, content) -> bytes:
+        # Naive datetimes stay unsuffixed, matching the default encoder's output
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS)
@@ -1,10 +1,10 @@
 # routes/admin_routes.py
 
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, HTTPException
 from database import user_collection # Motor collection
-from models.schemas import User, DoctorInfo
-from security import get_current_authenticated_user # UPDATED IMPORT
+from models.schemas import DoctorInfo
+from security import invalidate_cached_user
 
 router = APIRouter()
 
@@ -39,6 +39,7 @@ async def authorize_doctor(
         if update_result.matched_count == 0:
              raise HTTPException(status_code=404, detail="Doctor not found or email is not associated with a doctor account.")
 
+    invalidate_cached_user(doctor_email)
     return {"message": f"Doctor {doctor_email} is now fully authorized."}
 
 
@@ -2,13 +2,13 @@
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Form, Query
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from datetime import datetime
 from typing import Optional
 from bson import ObjectId
 from markdown_it import MarkdownIt
 
 # Security & Database
+from templating import templates
 from security import get_current_authenticated_user
 from models.schemas import User, ChatMessage
 from database import chat_messages_collection, user_collection
@@ -18,7 +18,6 @@ from ai_core.chatbot_service import MedicalChatbot
 from ai_core.helpers import fetch_patient_context
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 chatbot = MedicalChatbot()
 md = MarkdownIt()
 
@@ -42,7 +41,7 @@ async def get_ai_consultation_page(
     return templates.TemplateResponse("ai_consultation.html", {
         "request": request,
         "user": current_user,
-        "user_json": current_user.model_dump_json(by_alias=True),
+        "user_json": current_user.user_json,
         "datetime_cls": datetime,
         "patients": patients
     })
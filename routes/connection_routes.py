@@ -4,10 +4,10 @@ from bson import ObjectId
 from fastapi import APIRouter, Body, Depends, HTTPException, status
 from typing import List
 from datetime import datetime, timedelta
-from bson import ObjectId
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 # UPDATED IMPORT: Use new session dependency
-from security import get_current_authenticated_user 
+from security import get_current_authenticated_user, invalidate_cached_user
 from database import user_collection, connection_requests_collection, instant_meetings_collection
 # UPDATED IMPORT: Use rich schema name
 from models.schemas import User, ConnectionRequestModel
@@ -155,6 +155,8 @@ async def accept_connection_request(
         {"email": patient_email},
         {"$addToSet": {"doctor_list": doctor_email}}
     )
+    invalidate_cached_user(doctor_email)
+    invalidate_cached_user(patient_email)
     
     return {"message": "Connection request accepted successfully."}
 
@@ -253,6 +255,7 @@ async def request_instant_consultation(
         {"_id": matched_doctor["_id"]},
         {"$set": {"availability_status": "busy"}} 
     )
+    invalidate_cached_user(matched_doctor["email"])
 
     # 4. Create the Connection Request
     new_request = {
@@ -351,8 +354,9 @@ async def accept_instant_request(
     if not req:
         raise HTTPException(status_code=404, detail="Request not found or expired.")
 
-    # 2. Generate Google Meet Link
-    meet_link = create_google_meet_link(
+    # 2. Generate Google Meet Link (blocking Google API call: keep it off the event loop)
+    meet_link = await run_in_threadpool(
+        create_google_meet_link,
         summary=f"Instant Consult: Dr. {current_user.name.last} & {req['patient_name']}",
         start_time=datetime.utcnow(),
         attendee_emails=[current_user.email]
@@ -1,14 +1,13 @@
 # routes/doctor_routes.py
 
 from fastapi import APIRouter, Body, Depends, HTTPException, status, Query, UploadFile, File
-from fastapi.responses import JSONResponse, StreamingResponse
-from typing import List, Dict, Any, Optional
-from pydantic import ValidationError
+from typing import List, Dict
 from bson import ObjectId
 import tempfile
+import asyncio
 import os
 import io
-from datetime import datetime, timezone
+from datetime import datetime
 from fastapi.concurrency import run_in_threadpool
 import anyio
 
@@ -20,36 +19,25 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.lib.units import inch
 
 # Core Imports
-from security import get_current_authenticated_user
+from security import get_current_authenticated_user, invalidate_cached_user, USER_PUBLIC_PROJECTION
 # FIX: Added reports_collection to imports so we can save patient-visible reports
 from database import user_collection, medical_records_collection, report_contents_collection, reports_collection
 
 # Schemas
 from models.schemas import (
-    User, Name, Diagnosis, Medication, ReportPDFRequest, 
-    ReportContentRequest, DictationSaveBody, Prescription, MedicalRecord, Report
+    User, Name, ReportContentRequest, Prescription, Report
 )
 
 # AI Imports
 from ai_core.chatbot_service import MedicalChatbot
 from ai_core.parser_service import MedicalReportParser
 from ai_core.helpers import fetch_patient_context
+from ai_core.transcription_service import whisper_model
 
 # Initialize Services
 chatbot_service = MedicalChatbot()
 parser_service = MedicalReportParser(chatbot_service)
 
-# Whisper Model Setup
-try:
-    from faster_whisper import WhisperModel
-    import torch
-    WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "tiny")
-    WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cuda" if torch.cuda.is_available() else "cpu")
-    WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "float16" if WHISPER_DEVICE == "cuda" else "int8")
-    whisper_model = WhisperModel(WHISPER_MODEL_SIZE, device=WHISPER_DEVICE, compute_type=WHISPER_COMPUTE_TYPE)
-except ImportError:
-    whisper_model = None
-
 router = APIRouter()
 
 # --- HELPER DEPENDENCY ---
@@ -106,7 +94,7 @@ def create_report_pdf(doctor_info: dict, patient_info: dict, report_content_text
 @router.get("/api/patients/search")
 async def search_for_patient(
     current_user: User = Depends(get_current_doctor),
-    aarogya_id: str = Query(..., min_length=10, max_length=15)
+    aarogya_id: str = Query(..., min_length=10, max_length=20)
 ):
     if not current_user.is_authorized:
         raise HTTPException(status_code=403, detail="Unauthorized access.")
@@ -145,7 +133,7 @@ async def get_my_patients(current_user: User = Depends(get_current_doctor)):
     patients_cursor = user_collection.find({
         "email": {"$in": current_user.patient_list},
         "user_type": "patient"
-    })
+    }, USER_PUBLIC_PROJECTION)
     
     patient_list = await patients_cursor.to_list(length=None)
     validated_patients = []
@@ -169,6 +157,7 @@ async def doctor_toggle_public_status(
         {"email": current_user.email},
         {"$set": {"is_public": is_public}}
     )
+    invalidate_cached_user(current_user.email)
     return {"message": f"Your public status has been set to {is_public}."}
 
 # --- TRANSCRIPTION ---
@@ -199,7 +188,7 @@ async def transcribe_medical_report(
         )
         transcribed_text = "".join([segment.text for segment in segments_generator])
         
-        return JSONResponse({"transcription": transcribed_text.strip()})
+        return {"transcription": transcribed_text.strip()}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transcription error: {e}")
@@ -302,10 +291,11 @@ async def save_parsed_report_data(
         doctor_data=current_user.model_dump()
     )
 
-    # 2. Save Report Content (The actual text)
-    content_doc = {"content_text": report_content_text, "created_at": datetime.utcnow()}
-    insert_result = await report_contents_collection.insert_one(content_doc)
-    content_id = str(insert_result.inserted_id)
+    # 2. Report Content (The actual text). The id is generated client-side so the
+    # three writes below don't depend on each other and can go out together.
+    content_oid = ObjectId()
+    content_id = str(content_oid)
+    content_doc = {"_id": content_oid, "content_text": report_content_text, "created_at": datetime.utcnow(), "ref_count": 1}
 
     # 3. FIX: Create Entry in 'reports' Collection (For Patient View & Download)
     report_filename = f"Consultation_Report_{datetime.utcnow().strftime('%Y-%m-%d')}.pdf"
@@ -313,13 +303,11 @@ async def save_parsed_report_data(
     report_entry = Report(
         filename=report_filename,
         owner_email=patient['email'],
-        content_id=content_id,
+        content_id=content_oid,
         report_type="AI Generated Consultation",
         description="Doctor generated consultation report."
     )
-    
-    # Save to reports collection (Exclude 'id' so Mongo generates one)
-    await reports_collection.insert_one(report_entry.model_dump(by_alias=True, exclude={"id"}))
+    report_doc = report_entry.model_dump(by_alias=True, exclude={"id"})
 
     # 4. Update Medical Record (For Doctor View)
     # Using the simplified structure for embedded reports
@@ -343,13 +331,18 @@ async def save_parsed_report_data(
             else:
                  update_push[db_key] = {"$each": [item for item in extracted_data[key] if isinstance(item, dict)]}
 
-    await medical_records_collection.update_one(
-        {"patient_id": patient['email']},
-        {"$set": {"updated_at": datetime.utcnow()}, "$push": update_push},
-        upsert=True
+    # Save content, patient-visible report and record update concurrently
+    await asyncio.gather(
+        report_contents_collection.insert_one(content_doc),
+        reports_collection.insert_one(report_doc),
+        medical_records_collection.update_one(
+            {"patient_id": patient['email']},
+            {"$set": {"updated_at": datetime.utcnow()}, "$push": update_push},
+            upsert=True
+        )
     )
 
-    return JSONResponse({"message": "Saved and parsed successfully", "extracted_data": extracted_data})
+    return {"message": "Saved and parsed successfully", "extracted_data": extracted_data}
 
 @router.post("/set-availability", tags=["Doctor"])
 async def set_doctor_availability(
@@ -386,6 +379,7 @@ async def set_doctor_availability(
         {"email": current_user.email},
         {"$set": {"availability_status": status}}
     )
+    invalidate_cached_user(current_user.email)
     
     return {"message": f"Status updated to {status}", "current_status": status}
 
@@ -416,4 +410,4 @@ async def generate_medical_report_text_endpoint(
         transcribed_text=transcribed_text
     )
 
-    return JSONResponse({"report_text": formatted_report_text})
\ No newline at end of file
+    return {"report_text": formatted_report_text}
\ No newline at end of file
@@ -1,14 +1,15 @@
 # routes/patient_routes.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
 
 # Security & Database
+from templating import templates
 from security import get_current_authenticated_user
 from models.schemas import User
-from database import db, user_collection, instant_meetings_collection,notifications_collection
+from database import user_collection, instant_meetings_collection,notifications_collection
 
 # AI Core
 from ai_core.chatbot_service import MedicalChatbot
@@ -16,7 +17,6 @@ from ai_core.helpers import fetch_patient_context
 from app.services.google_service import create_google_meet_link
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 chatbot = MedicalChatbot()
 
 @router.get("/wellness", response_class=HTMLResponse)
@@ -86,9 +86,10 @@ async def alert_doctor(
     request: Request, 
     current_user: User = Depends(get_current_authenticated_user)
 ):
-    # 1. Generate Emergency Google Meet Link (SYNCHRONOUS CALL)
-    # We remove 'await' because the function in google_service.py is not async
-    meet_link = create_google_meet_link(
+    # 1. Generate Emergency Google Meet Link
+    # The google_service call is synchronous, so it runs in the threadpool
+    meet_link = await run_in_threadpool(
+        create_google_meet_link,
         summary=f"🚨 SOS EMERGENCY: {current_user.name.first} {current_user.name.last}",
         start_time=datetime.utcnow(),
         attendee_emails=[current_user.email]
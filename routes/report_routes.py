@@ -1,25 +1,324 @@
 # routes/report_routes.py
 import os
-import fitz # PyMuPDF
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status, Body, BackgroundTasks
-from fastapi.responses import FileResponse
+import codecs
+import atexit
+import queue
+import hashlib
+import logging
+import tempfile
+from logging.handlers import QueueHandler, QueueListener
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status, Body
+from fastapi.responses import Response
+from urllib.parse import quote
 from typing import List
 from bson import ObjectId
-from fpdf import FPDF
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from cachetools import LRUCache, TTLCache
 import asyncio
 from datetime import datetime
 
 # Database & Auth
-from models.schemas import MedicalRecord, User, Report, ReportContentRequest
+from models.schemas import MedicalRecord, User, Report
 from security import get_current_authenticated_user
+from responses import BSONJSONResponse
 from database import reports_collection, user_collection, medical_records_collection, report_contents_collection
 
 # NEW AI Service (Replaces RAG Engine)
-from ai_core.chatbot_service import MedicalChatbot
+from ai_core.chatbot_service import MedicalChatbot, FALLBACK_RESPONSES
+
+# CPU-bound PDF helpers (run in a dedicated process pool)
+from app.services.pdf_service import run_in_cpu_pool, extract_text_async, generate_fpdf
 
 router = APIRouter()
 chatbot = MedicalChatbot()
 
+# Handlers only enqueue records; a background thread does the actual stream I/O,
+# so request handlers never block on the stdout/stderr lock.
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(_log_queue, logging.StreamHandler())
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+logger = logging.getLogger("reports")
+logger.addHandler(QueueHandler(_log_queue))
+logger.propagate = False
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 25 * 1024 * 1024))
+# Shorter reports are not worth an LLM call
+MIN_SUMMARY_LENGTH = 32
+
+# Recently loaded report_contents documents, keyed by content _id, for the
+# download -> summarize pattern. Bounded by total characters of cached text.
+# Only content is cached: the report itself (and so the access check) is read
+# from Mongo on every call. The cache is per process; an entry deleted on one
+# worker can linger on others for up to REPORT_CACHE_TTL, but it is unreachable
+# there too because no visible report references it any more.
+REPORT_CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", 300))
+REPORT_CACHE_MAX_CHARS = int(os.getenv("REPORT_CACHE_MAX_CHARS", 32 * 1024 * 1024))
+_content_cache = TTLCache(
+    maxsize=REPORT_CACHE_MAX_CHARS,
+    ttl=REPORT_CACHE_TTL,
+    getsizeof=lambda content: 1 + len(content.get("content_text", ""))
+)
+
+# Report _id -> content _id for reports seen by load_visible_report. content_id
+# is set at upload and never changes, so entries can't go stale; they only let
+# a cache hit skip the $lookup join.
+_report_content_ids = LRUCache(maxsize=int(os.getenv("REPORT_ID_CACHE_MAX", 10000)))
+
+# List views only need the Report fields; cap enforced server-side
+REPORT_LIST_LIMIT = 100
+REPORT_LIST_PROJECTION = {
+    "filename": 1, "upload_date": 1, "owner_email": 1,
+    "content_id": 1, "report_type": 1, "description": 1
+}
+# Report's optional fields: rows written with exclude_none lack them, but the
+# response must still carry them as null, as Report serialization did
+REPORT_ROW_DEFAULTS = {"content_id": None, "report_type": None, "description": None}
+
+async def spool_upload(file: UploadFile, decode_text: bool = False):
+    """
+    Reads an upload in 1 MB chunks, rejecting it (413) past MAX_UPLOAD_SIZE.
+    Small files are returned as bytes; anything past SPOOL_MAX_SIZE is spilled
+    to a temp file and its path is returned instead, so large PDFs are never
+    fully materialized in memory. The caller owns (and must remove) a returned path.
+    With decode_text, the file is decoded as UTF-8 chunk by chunk instead of
+    buffered ("" if it isn't valid UTF-8).
+    Returns (bytes | path | None, sha256 hex digest of the file, text | None).
+    """
+    buffer = bytearray()
+    spill = None
+    digest = hashlib.sha256()
+    size = 0
+    decoder = codecs.getincrementaldecoder('utf-8')() if decode_text else None
+    text_parts = []
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > MAX_UPLOAD_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File exceeds the {MAX_UPLOAD_SIZE // (1024 * 1024)} MB upload limit."
+                )
+            digest.update(chunk)
+            if decode_text:
+                if decoder is not None:
+                    try:
+                        text_parts.append(decoder.decode(chunk))
+                    except UnicodeDecodeError:
+                        # Keep reading for the digest and size cap; the text is unusable
+                        decoder, text_parts = None, []
+                continue
+            if spill is None and len(buffer) + len(chunk) > SPOOL_MAX_SIZE:
+                spill = tempfile.NamedTemporaryFile(suffix="_upload", delete=False)
+                await asyncio.to_thread(spill.write, buffer)
+                buffer.clear()
+            if spill is None:
+                buffer += chunk
+            else:
+                await asyncio.to_thread(spill.write, chunk)
+    except BaseException:
+        if spill is not None:
+            spill.close()
+            os.remove(spill.name)
+        raise
+
+    if decode_text:
+        if decoder is not None:
+            try:
+                text_parts.append(decoder.decode(b"", final=True))
+            except UnicodeDecodeError:
+                text_parts = []
+        return None, digest.hexdigest(), "".join(text_parts)
+    if spill is None:
+        return bytes(buffer), digest.hexdigest(), None
+    spill.close()
+    return spill.name, digest.hexdigest(), None
+
+async def valid_oid(report_id: str) -> ObjectId:
+    """Path dependency: rejects malformed report ids before any DB work."""
+    # async so FastAPI doesn't dispatch this cheap check to the threadpool
+    if not ObjectId.is_valid(report_id):
+        raise HTTPException(status_code=400, detail="Invalid Report ID format.")
+    return ObjectId(report_id)
+
+def text_digest(text: str) -> str:
+    """SHA-256 of the extracted text; identical contents share a cached summary."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def pdf_response(pdf_bytes: bytes, filename: str) -> Response:
+    """Serves a rendered PDF straight from memory as an attachment."""
+    # Same Content-Disposition rules as FileResponse (RFC 5987 for non-ASCII names)
+    quoted = quote(filename)
+    if quoted != filename:
+        disposition = f"attachment; filename*=utf-8''{quoted}"
+    else:
+        disposition = f'attachment; filename="{filename}"'
+    return Response(content=pdf_bytes, media_type='application/pdf', headers={"Content-Disposition": disposition})
+
+# report_contents documents carry a ref_count of the reports pointing at them
+# (byte-identical uploads share one). References are taken and dropped with
+# atomic $inc updates, and a delete re-checks the count in its own filter, so an
+# upload reusing content can never race a delete into a dangling content_id.
+async def claim_existing_content(file_sha256: str):
+    """Takes a reference on stored content with this file hash; None if there is none."""
+    return await report_contents_collection.find_one_and_update(
+        {"sha256": file_sha256}, {"$inc": {"ref_count": 1}}, projection={"_id": 1}
+    )
+
+async def release_content(content_oid: ObjectId, report_oid: ObjectId):
+    """Drops `report_oid`'s reference; the content is deleted with its last reference."""
+    released = await report_contents_collection.find_one_and_update(
+        {"_id": content_oid, "ref_count": {"$exists": True}},
+        {"$inc": {"ref_count": -1}},
+        projection={"ref_count": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if released is None:
+        # Content from before ref counting (see migrate.py): count references
+        shared = await reports_collection.count_documents(
+            {"content_id": {"$in": [content_oid, str(content_oid)]}, "_id": {"$ne": report_oid}}, limit=1
+        )
+        if shared:
+            return
+        delete_filter = {"_id": content_oid, "ref_count": {"$exists": False}}
+    elif released["ref_count"] > 0:
+        return
+    else:
+        delete_filter = {"_id": content_oid, "ref_count": {"$lte": 0}}
+    # Only matches if no upload took a new reference since the decrement
+    result = await report_contents_collection.delete_one(delete_filter)
+    if result.deleted_count:
+        _content_cache.pop(content_oid, None)
+
+def as_content_oid(content_id):
+    """Older reports store content_id as a hex string; newer ones as an ObjectId."""
+    if isinstance(content_id, str) and ObjectId.is_valid(content_id):
+        return ObjectId(content_id)
+    return content_id if isinstance(content_id, ObjectId) else None
+
+async def find_report_with_content(match: dict, with_text: bool = True):
+    """
+    Fetches one report (list fields only) together with its report_contents
+    document in a single round-trip ($lookup). The content is returned under
+    "content" (None if missing).
+    """
+    pipeline = [
+        {"$match": match},
+        {"$limit": 1},
+        # content_id is a hex string on older reports; malformed/missing ids join nothing
+        {"$project": {**REPORT_LIST_PROJECTION, "content_oid": {"$convert": {
+            "input": "$content_id", "to": "objectId", "onError": None, "onNull": None
+        }}}},
+        {"$lookup": {
+            "from": report_contents_collection.name,
+            "localField": "content_oid",
+            "foreignField": "_id",
+            "as": "content"
+        }},
+    ]
+    if not with_text:
+        pipeline.append({"$project": {"content.content_text": 0}})
+
+    docs = await reports_collection.aggregate(pipeline).to_list(length=1)
+    if not docs:
+        return None
+    report = docs[0]
+    report["content"] = report["content"][0] if report["content"] else None
+    return report
+
+async def load_visible_report(report_oid: ObjectId, current_user: User, as_doctor: bool, with_text: bool = True) -> dict:
+    """
+    Shared loader for the patient and doctor download/summarize routes. Only own
+    reports (or connected patients' for doctors) match the query; anything else
+    is simply "not found". The content document is attached under "content"
+    (None if missing), served from _content_cache when possible.
+    """
+    if as_doctor and current_user.user_type != "doctor":
+        raise HTTPException(status_code=403, detail="Access denied.")
+
+    # Access is part of the query, evaluated by Mongo on every call
+    owner = {"$in": current_user.patient_list} if as_doctor else current_user.email
+    match = {"_id": report_oid, "owner_email": owner}
+
+    content_oid = _report_content_ids.get(report_oid)
+    content = _content_cache.get(content_oid) if content_oid else None
+    # A cached text-less entry (from a summarize) can't serve a download
+    if content is not None and (not with_text or "content_text" in content):
+        report = await reports_collection.find_one(match, REPORT_LIST_PROJECTION)
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+        report["content"] = content
+        return report
+
+    report = await find_report_with_content(match, with_text)
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    content_oid = report.pop("content_oid", None)
+    content = report["content"]
+    if content_oid:
+        _report_content_ids[report_oid] = content_oid
+    # Never replace a cached full document with a text-less one
+    if content and (with_text or content_oid not in _content_cache):
+        try:
+            _content_cache[content_oid] = content
+        except ValueError:
+            pass  # larger than the whole cache
+    return report
+
+async def render_report_pdf(report: dict) -> Response:
+    """Renders a loaded report's text to a PDF download."""
+    content_doc = report["content"]
+    report_content = content_doc.get("content_text") if content_doc else None
+    if not report_content:
+        raise HTTPException(status_code=404, detail="Report content is empty.")
+
+    pdf_bytes = await run_in_cpu_pool(generate_fpdf, report_content)
+    return pdf_response(pdf_bytes, f"{os.path.splitext(report['filename'])[0]}.pdf")
+
+async def get_or_create_summary(meta) -> str:
+    """
+    Returns the persisted summary for a report content document.
+    `meta` is the (possibly cached) content document, with or without its text;
+    it is updated in place with the new summary.
+    The LLM is only called the first time a given text is summarized.
+    """
+    if not meta:
+        return "Empty report."
+    if meta.get("summary"):
+        return meta["summary"]
+    if meta.get("content_length", MIN_SUMMARY_LENGTH) < MIN_SUMMARY_LENGTH:
+        return "Empty report."
+
+    content_oid = meta["_id"]
+    if "content_text" in meta:
+        content_doc = meta
+    else:
+        content_doc = await report_contents_collection.find_one(
+            {"_id": content_oid}, {"content_text": 1, "text_sha256": 1}
+        )
+    report_content = content_doc.get("content_text") if content_doc else None
+    if not report_content or len(report_content) < MIN_SUMMARY_LENGTH:
+        return "Empty report."
+
+    digest = content_doc.get("text_sha256") or text_digest(report_content)
+
+    # Identical text uploaded elsewhere may already have a summary
+    twin = await report_contents_collection.find_one(
+        {"text_sha256": digest, "summary": {"$exists": True}}, {"summary": 1}
+    )
+    summary = twin["summary"] if twin else await chatbot.summarize_report_text(report_content)
+
+    if summary not in FALLBACK_RESPONSES:
+        await report_contents_collection.update_one(
+            {"_id": content_oid}, {"$set": {"summary": summary, "text_sha256": digest}}
+        )
+        meta["summary"] = summary
+    return summary
+
 @router.post("/upload")
 async def upload_report(
     current_user: User = Depends(get_current_authenticated_user),
@@ -30,42 +329,99 @@ async def upload_report(
     (Pinecone ingestion has been removed).
     """
     
-    file_content = await file.read()
-    
-    # Helper to run synchronous PDF parsing in a thread
-    def extract_text_sync():
-        extracted_text = ""
+    # Plain text is decoded while it streams in; only PDFs need the parser pool
+    upload_source, file_sha256, decoded_text = await spool_upload(
+        file, decode_text=file.content_type == 'text/plain'
+    )
+
+    # Byte-identical files share one content document: no re-extraction, no re-insert
+    existing = await claim_existing_content(file_sha256)
+    content_doc = None
+
+    if existing:
+        if isinstance(upload_source, str):
+            os.remove(upload_source)
+        content_oid = existing["_id"]
+    else:
+        # PDF parsing is CPU-bound, so it runs in the process pool
         try:
-            if file.content_type == 'application/pdf':
-                with fitz.open(stream=file_content, filetype="pdf") as doc:
-                    extracted_text = "".join(page.get_text() for page in doc)
-            elif file.content_type == 'text/plain':
-                extracted_text = file_content.decode('utf-8')
+            if decoded_text is not None:
+                extracted_text = decoded_text
+            else:
+                extracted_text = await extract_text_async(upload_source, file.content_type)
         except Exception as e:
-            print(f"Error extracting text: {e}")
-        return extracted_text
-
-    extracted_text = await asyncio.to_thread(extract_text_sync)
-        
-    if not extracted_text:
-        # We still allow the upload even if text extraction fails, but warn/log it
-        print(f"Warning: Could not extract text from {file.filename}")
-        extracted_text = "Content could not be extracted automatically."
-
-    # 1. Save content to dedicated collection
-    content_doc = {"content_text": extracted_text, "upload_date": datetime.utcnow()} 
-    insert_content_result = await report_contents_collection.insert_one(content_doc) 
-    content_id = str(insert_content_result.inserted_id)
-    
-    # 2. Save the report reference
+            logger.error(f"Error extracting text from {file.filename}: {e}")
+            extracted_text = ""
+        finally:
+            if isinstance(upload_source, str):
+                os.remove(upload_source)
+
+        extracted = bool(extracted_text)
+        if not extracted:
+            # We still allow the upload even if text extraction fails, but warn/log it
+            logger.warning(f"Could not extract text from {file.filename}")
+            extracted_text = "Content could not be extracted automatically."
+
+        content_oid = ObjectId()
+        content_doc = {
+            "_id": content_oid,
+            "content_text": extracted_text,
+            "content_length": len(extracted_text),
+            "text_sha256": text_digest(extracted_text),
+            "upload_date": datetime.utcnow(),
+            "ref_count": 1
+        }
+        # Only successful extractions are reusable by later identical uploads
+        if extracted:
+            content_doc["sha256"] = file_sha256
+
+    # 1. Build the report reference (ids generated client-side)
+    report_oid = ObjectId()
     report_data = Report(
         filename=file.filename,
         owner_email=current_user.email,
-        content_id=content_id, 
+        content_id=content_oid, 
         report_type=f"User Upload ({file.content_type.split('/')[-1].upper()})",
     )
-    
-    await reports_collection.insert_one(report_data.model_dump(by_alias=True, exclude_none=True)) 
+    report_doc = report_data.model_dump(by_alias=True, exclude_none=True)
+    report_doc["_id"] = report_oid
+
+    # 2. Both inserts are independent once the ids are known, so issue them together
+    if content_doc is None:
+        try:
+            await reports_collection.insert_one(report_doc)
+        except Exception:
+            await release_content(content_oid, report_oid)
+            raise
+    else:
+        content_result, report_result = await asyncio.gather(
+            report_contents_collection.insert_one(content_doc),
+            reports_collection.insert_one(report_doc),
+            return_exceptions=True
+        )
+        if isinstance(report_result, Exception):
+            if not isinstance(content_result, Exception):
+                await release_content(content_oid, report_oid)
+            raise report_result
+        if isinstance(content_result, DuplicateKeyError):
+            # A concurrent identical upload stored the content first; share it
+            winner = await claim_existing_content(file_sha256)
+            if winner is None:
+                # ...and it was deleted again in between: keep our own copy, unshared
+                content_doc.pop("sha256")
+                try:
+                    await report_contents_collection.insert_one(content_doc)
+                except Exception:
+                    await reports_collection.delete_one({"_id": report_oid})
+                    raise
+            else:
+                await reports_collection.update_one(
+                    {"_id": report_oid}, {"$set": {"content_id": winner["_id"]}}
+                )
+        elif isinstance(content_result, Exception):
+            # Don't leave a report pointing at content that was never stored
+            await reports_collection.delete_one({"_id": report_oid})
+            raise content_result
     
     return {"message": f"Successfully uploaded {file.filename}."}
 
@@ -87,125 +443,88 @@ async def doctor_add_report(
     if not patient or patient_email not in current_user.patient_list:
         raise HTTPException(status_code=403, detail="You are not connected to this patient.")
 
-    # 1. Save content
-    content_doc = {"content_text": report_content, "upload_date": datetime.utcnow()}
-    insert_content_result = await report_contents_collection.insert_one(content_doc)
-    content_id = str(insert_content_result.inserted_id)
-
-    # 2. Save reference
+    # 1. Build content + reference
+    content_oid = ObjectId()
+    content_doc = {
+        "_id": content_oid,
+        "content_text": report_content,
+        "content_length": len(report_content),
+        "text_sha256": text_digest(report_content),
+        "upload_date": datetime.utcnow(),
+        "ref_count": 1
+    }
+    report_oid = ObjectId()
     report_data = Report(
         filename=filename,
         owner_email=patient_email,
-        content_id=content_id,
+        content_id=content_oid,
         report_type="Doctor's Manual Note"
     )
-
-    await reports_collection.insert_one(report_data.model_dump(by_alias=True, exclude_none=True))
+    report_doc = report_data.model_dump(by_alias=True, exclude_none=True)
+    report_doc["_id"] = report_oid
+
+    # 2. Save both concurrently; if one fails, undo the other before re-raising
+    content_result, report_result = await asyncio.gather(
+        report_contents_collection.insert_one(content_doc),
+        reports_collection.insert_one(report_doc),
+        return_exceptions=True
+    )
+    if isinstance(report_result, Exception):
+        if not isinstance(content_result, Exception):
+            await release_content(content_oid, report_oid)
+        raise report_result
+    if isinstance(content_result, Exception):
+        await reports_collection.delete_one({"_id": report_oid})
+        raise content_result
 
     return {"message": f"Successfully added report for {patient_email}."}
 
 @router.get("/my-reports", response_model=List[Report])
 async def get_user_reports(current_user: User = Depends(get_current_authenticated_user)):
     """Retrieves all reports for the current user."""
-    reports_cursor = reports_collection.find({"owner_email": current_user.email}).sort("upload_date", -1)
-    reports_list = await reports_cursor.to_list(length=100)
+    reports_cursor = reports_collection.find(
+        {"owner_email": current_user.email}, REPORT_LIST_PROJECTION
+    ).sort("upload_date", -1).limit(REPORT_LIST_LIMIT)
     
-    validated_reports = []
-    for report in reports_list:
-        if '_id' in report: report['_id'] = str(report['_id'])
-        if 'content_id' in report: report['content_id'] = str(report['content_id'])
-        validated_reports.append(Report.model_validate(report))
-        
-    return validated_reports
+    reports = [{**REPORT_ROW_DEFAULTS, **report} async for report in reports_cursor]
+    # The projection (plus null defaults) shapes each row like Report: skip per-row
+    # model validation; ObjectIds are stringified by the encoder (response_model stays for the docs)
+    return BSONJSONResponse(reports)
 
 @router.delete("/{report_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_report(report_id: str, current_user: User = Depends(get_current_authenticated_user)):
+async def delete_report(report_oid: ObjectId = Depends(valid_oid), current_user: User = Depends(get_current_authenticated_user)):
     """Deletes a report and its content."""
-    try:
-        report_oid = ObjectId(report_id)
-        report = await reports_collection.find_one({"_id": report_oid})
-    except Exception:
-         raise HTTPException(status_code=400, detail="Invalid Report ID format.")
-         
+    report = await reports_collection.find_one({"_id": report_oid})
     if not report or report["owner_email"] != current_user.email:
         raise HTTPException(status_code=404, detail="Report not found")
     
-    # 1. Delete content (Pinecone deletion removed)
-    if report.get("content_id"):
-        try:
-            await report_contents_collection.delete_one({"_id": ObjectId(report["content_id"])})
-        except Exception:
-            pass 
-    
-    # 2. Delete reference
-    await reports_collection.delete_one({"_id": report_oid})
+    # Content and reference deletes are independent: run them concurrently.
+    # Content may be shared with byte-identical uploads; it goes with its last reference.
+    tasks = [reports_collection.delete_one({"_id": report_oid})]
+    _report_content_ids.pop(report_oid, None)
+    content_oid = as_content_oid(report.get("content_id"))
+    if content_oid:
+        tasks.append(release_content(content_oid, report_oid))
+
+    for result in await asyncio.gather(*tasks, return_exceptions=True):
+        if isinstance(result, Exception):
+            logger.error(f"Error deleting report {report_oid}: {result}")
     return
 
 @router.get("/{report_id}/download")
 async def download_report_as_pdf(
-    report_id: str, 
-    background_tasks: BackgroundTasks, 
+    report_oid: ObjectId = Depends(valid_oid), 
     current_user: User = Depends(get_current_authenticated_user)
 ):
     """Downloads the report content as a PDF."""
-    try:
-        report = await reports_collection.find_one({"_id": ObjectId(report_id)})
-    except Exception:
-         raise HTTPException(status_code=400, detail="Invalid Report ID.")
-
-    if not report or report["owner_email"] != current_user.email:
-        raise HTTPException(status_code=404, detail="Report not found")
-        
-    content_id = report.get("content_id")
-    if not content_id:
-        raise HTTPException(status_code=400, detail="Report has no stored content.")
-
-    content_doc = await report_contents_collection.find_one({"_id": ObjectId(content_id)})
-    report_content = content_doc.get("content_text") if content_doc else None
-    
-    if not report_content:
-        raise HTTPException(status_code=404, detail="Report content is empty.")
-    
-    def generate_fpdf(content, filename):
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        pdf_text = content.encode('latin-1', 'replace').decode('latin-1')
-        pdf.multi_cell(0, 10, txt=pdf_text)
-        temp_path = f"temp_{filename}_{os.getpid()}.pdf"
-        pdf.output(temp_path)
-        return temp_path
-
-    temp_pdf_path = await asyncio.to_thread(generate_fpdf, report_content, report_id)
-    background_tasks.add_task(os.remove, temp_pdf_path)
-    
-    return FileResponse(
-        temp_pdf_path,
-        media_type='application/pdf',
-        filename=f"{os.path.splitext(report['filename'])[0]}.pdf"
-    )
+    report = await load_visible_report(report_oid, current_user, as_doctor=False)
+    return await render_report_pdf(report)
 
 @router.post("/{report_id}/summarize")
-async def summarize_report(report_id: str, current_user: User = Depends(get_current_authenticated_user)):
+async def summarize_report(report_oid: ObjectId = Depends(valid_oid), current_user: User = Depends(get_current_authenticated_user)):
     """Summarizes a SINGLE report using the new Chatbot Service."""
-    try:
-        report = await reports_collection.find_one({"_id": ObjectId(report_id)})
-    except Exception:
-         raise HTTPException(status_code=400, detail="Invalid ID.")
-
-    if not report or report["owner_email"] != current_user.email:
-        raise HTTPException(status_code=404, detail="Report not found")
-
-    content_doc = await report_contents_collection.find_one({"_id": ObjectId(report.get("content_id"))})
-    report_content = content_doc.get("content_text") if content_doc else None
-
-    if not report_content:
-         return {"filename": report['filename'], "summary": "Empty report."}
-
-    # Use the new service
-    summary = await chatbot.summarize_report_text(report_content)
-
-    return {"filename": report['filename'], "summary": summary}
+    report = await load_visible_report(report_oid, current_user, as_doctor=False, with_text=False)
+    return {"filename": report['filename'], "summary": await get_or_create_summary(report["content"])}
 
 @router.get("/patient-by-id/{patient_aarogya_id}", response_model=List[Report], tags=["Reports"])
 async def get_patient_reports_for_doctor(patient_aarogya_id: str, current_user: User = Depends(get_current_authenticated_user)):
@@ -213,23 +532,19 @@ async def get_patient_reports_for_doctor(patient_aarogya_id: str, current_user:
     if current_user.user_type != "doctor":
         raise HTTPException(status_code=403, detail="Access denied.")
     
-    patient = await user_collection.find_one({"aarogya_id": patient_aarogya_id})
+    patient = await user_collection.find_one({"aarogya_id": patient_aarogya_id}, {"email": 1})
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found.")
     
     if patient["email"] not in current_user.patient_list:
         raise HTTPException(status_code=403, detail="Patient not connected.")
         
-    reports_cursor = reports_collection.find({"owner_email": patient["email"]}).sort("upload_date", -1)
-    reports_list = await reports_cursor.to_list(length=100)
-
-    validated_reports = []
-    for report in reports_list:
-        if '_id' in report: report['_id'] = str(report['_id'])
-        if 'content_id' in report: report['content_id'] = str(report['content_id'])
-        validated_reports.append(Report.model_validate(report))
-        
-    return validated_reports
+    reports_cursor = reports_collection.find(
+        {"owner_email": patient["email"]}, REPORT_LIST_PROJECTION
+    ).sort("upload_date", -1).limit(REPORT_LIST_LIMIT)
+
+    reports = [{**REPORT_ROW_DEFAULTS, **report} async for report in reports_cursor]
+    return BSONJSONResponse(reports)
 
 @router.get("/my-structured-record", response_model=MedicalRecord, tags=["Reports"])
 async def get_my_structured_record(current_user: User = Depends(get_current_authenticated_user)):
@@ -242,52 +557,18 @@ async def get_my_structured_record(current_user: User = Depends(get_current_auth
 
 @router.get("/doctor/download/{report_id}")
 async def doctor_download_patient_report(
-    report_id: str,
-    background_tasks: BackgroundTasks, 
+    report_oid: ObjectId = Depends(valid_oid),
     current_user: User = Depends(get_current_authenticated_user)
 ):
     """Doctor download route."""
-    if current_user.user_type != "doctor":
-        raise HTTPException(status_code=403, detail="Access denied.")
-        
-    report = await reports_collection.find_one({"_id": ObjectId(report_id)})
-    if not report: raise HTTPException(404, "Report not found")
-    
-    if report["owner_email"] not in current_user.patient_list:
-        raise HTTPException(403, "Not connected to patient.")
-    
-    content_doc = await report_contents_collection.find_one({"_id": ObjectId(report["content_id"])})
-    # ... reuse generation logic or abstract it ...
-    # For brevity, reusing the same FPDF logic here:
-    
-    def generate_fpdf(content, filename):
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-        pdf_text = content.encode('latin-1', 'replace').decode('latin-1')
-        pdf.multi_cell(0, 10, txt=pdf_text)
-        temp_path = f"temp_{filename}_{os.getpid()}.pdf"
-        pdf.output(temp_path)
-        return temp_path
-
-    temp_path = await asyncio.to_thread(generate_fpdf, content_doc.get("content_text", ""), report_id)
-    background_tasks.add_task(os.remove, temp_path)
-    return FileResponse(temp_path, media_type='application/pdf', filename=f"{report['filename']}.pdf")
+    report = await load_visible_report(report_oid, current_user, as_doctor=True)
+    return await render_report_pdf(report)
 
 @router.post("/doctor/summarize/{report_id}")
 async def doctor_summarize_patient_report(
-    report_id: str, 
+    report_oid: ObjectId = Depends(valid_oid), 
     current_user: User = Depends(get_current_authenticated_user)
 ):
     """Doctor summary route."""
-    if current_user.user_type != "doctor": raise HTTPException(403)
-
-    report = await reports_collection.find_one({"_id": ObjectId(report_id)})
-    if not report: raise HTTPException(404)
-
-    if report["owner_email"] not in current_user.patient_list: raise HTTPException(403)
-
-    content_doc = await report_contents_collection.find_one({"_id": ObjectId(report["content_id"])})
-    summary = await chatbot.summarize_report_text(content_doc.get("content_text", ""))
-
-    return {"filename": report['filename'], "summary": summary}
\ No newline at end of file
+    report = await load_visible_report(report_oid, current_user, as_doctor=True, with_text=False)
+    return {"filename": report['filename'], "summary": await get_or_create_summary(report["content"])}
\ No newline at end of file
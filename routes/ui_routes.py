@@ -1,167 +1,192 @@
 # routes/ui_routes.py
 
-from fastapi import APIRouter, Request, Depends, HTTPException, status
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from security import get_current_authenticated_user, get_optional_user
+from fastapi import APIRouter, Request, Depends, status
+from fastapi.responses import HTMLResponse, Response
+from templating import templates
+from security import get_current_authenticated_user, get_optional_user, require_role
 # FIX 1: Import the User model for correct type hinting
 from models.schemas import User
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import datetime
+import hashlib
 
 # --- Setup ---
-templates = Jinja2Templates(directory="templates")
 router = APIRouter()
 
-# --- Universal Dependencies ---
-def get_base_template_context(request: Request) -> Dict[str, Any]:
-    """Provides essential context variables for all templates."""
-    return {
-        "request": request,
-        "datetime_cls": datetime.datetime, 
-    }
+# Role-gated user dependencies (403 for the other role)
+require_doctor = require_role("doctor")
+require_patient = require_role("patient")
+
+# --- Universal Context ---
+# Constant variables available to every template; handlers add "request" and their own keys.
+_BASE: Dict[str, Any] = {
+    "datetime_cls": datetime.datetime,
+}
+
+# Rendered HTML of the anonymous pages (no user in the context), so each is
+# rendered once per process. url_for() emits absolute URLs, so the base URL the
+# page was requested under is part of the key; the size cap keeps arbitrary
+# Host headers from growing it without bound.
+STATIC_PAGE_CACHE_MAX = 64
+_static_page_cache: Dict[tuple, Tuple[bytes, str]] = {}
+
+def render_static_page(request: Request, template_name: str, title: str) -> Response:
+    """
+    Renders a user-agnostic page, served from _static_page_cache after the first hit.
+    Carries a weak ETag; a matching If-None-Match gets an empty 304.
+    """
+    # The footer prints the current year, so it is part of the key too
+    key = (template_name, title, str(request.base_url), datetime.datetime.utcnow().year)
+    cached = _static_page_cache.get(key)
+    if cached is None:
+        body = templates.TemplateResponse(template_name, {"title": title, "request": request, **_BASE}).body
+        cached = (body, f'W/"{hashlib.blake2b(body, digest_size=8).hexdigest()}"')
+        if len(_static_page_cache) < STATIC_PAGE_CACHE_MAX:
+            _static_page_cache[key] = cached
+    body, etag = cached
+
+    # no-cache = revalidate every time: "/" must still redirect once the visitor logs in
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return HTMLResponse(body, headers=headers)
+
+# Site-root redirects for logged-in users: fixed targets, so the headers are
+# built once instead of going through RedirectResponse's URL quoting per request
+_DOCTOR_REDIRECT_HEADERS = {"location": "/doctor/dashboard"}
+_PROFILE_REDIRECT_HEADERS = {"location": "/profile"}
 
 # --- UI Routes ---
 
 @router.get("/", response_class=HTMLResponse)
 async def home_page(
     # FIX 2: Use the correct Pydantic model type hint
-    current_user: Optional[User] = Depends(get_optional_user),
-    base_context: Dict[str, Any] = Depends(get_base_template_context)
+    request: Request,
+    current_user: Optional[User] = Depends(get_optional_user)
 ):
     """Renders the Home page. Redirects logged-in users."""
     if current_user:
         # FIX 3: Use dot notation for attribute access
         if current_user.user_type == "doctor":
-            return RedirectResponse("/doctor/dashboard", status_code=status.HTTP_303_SEE_OTHER)
+            return Response(status_code=status.HTTP_303_SEE_OTHER, headers=_DOCTOR_REDIRECT_HEADERS)
         # Assuming other users are patients
-        return RedirectResponse("/profile", status_code=status.HTTP_303_SEE_OTHER)
+        return Response(status_code=status.HTTP_303_SEE_OTHER, headers=_PROFILE_REDIRECT_HEADERS)
         
-    context = {
-        "title": "Aarogya AI - Home",
-        **base_context
-        }
-    return templates.TemplateResponse("home.html", context)
+    return render_static_page(request, "home.html", "Aarogya AI - Home")
 
 @router.get("/users/login", response_class=HTMLResponse)
-async def login_page(base_context: Dict[str, Any] = Depends(get_base_template_context)):
+async def login_page(request: Request):
     """Renders the login form page."""
-    context = {"title": "User Login", **base_context}
-    return templates.TemplateResponse("login.html", context)
+    return render_static_page(request, "login.html", "User Login")
 
 @router.get("/users/register/patient", response_class=HTMLResponse)
-async def register_patient_page(base_context: Dict[str, Any] = Depends(get_base_template_context)):
+async def register_patient_page(request: Request):
     """Renders the patient registration form."""
-    context = {"title": "Register as Patient", **base_context}
-    return templates.TemplateResponse("register_patient.html", context)
+    return render_static_page(request, "register_patient.html", "Register as Patient")
 
 @router.get("/doctor/patients/search", response_class=HTMLResponse)
 async def search_patient_page(
     request: Request,
-    current_user: User = Depends(get_current_authenticated_user),
-    base_context: Dict[str, Any] = Depends(get_base_template_context)
+    current_user: User = Depends(require_doctor)
 ):
     """Renders the page where a doctor can search for a patient."""
-    if current_user.user_type != "doctor":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied.")
-    
-    context = {"title": "Search for Patient", "user": current_user, **base_context}
+    context = {"title": "Search for Patient", "user": current_user, "request": request, **_BASE}
     return templates.TemplateResponse("search_patient.html", context)
 
 @router.get("/users/register/doctor", response_class=HTMLResponse)
-async def register_doctor_page(base_context: Dict[str, Any] = Depends(get_base_template_context)):
+async def register_doctor_page(request: Request):
     """Renders the doctor registration form."""
-    context = {"title": "Register as Doctor", **base_context}
-    return templates.TemplateResponse("register_doctor.html", context)
+    return render_static_page(request, "register_doctor.html", "Register as Doctor")
 
 @router.get("/profile", response_class=HTMLResponse)
 async def patient_dashboard_page(
-    current_user: User = Depends(get_current_authenticated_user),
-    base_context: Dict[str, Any] = Depends(get_base_template_context)
+    request: Request,
+    current_user: User = Depends(require_patient)
 ):
     """Renders the Patient Dashboard/Profile (Protected)."""
-    if current_user.user_type != "patient":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied.")
-    
     # FIX 4: Add 'user_json' to the context for safe template rendering
     context = {
         "title": "Patient Dashboard", 
         "user": current_user, 
-        "user_json": current_user.model_dump_json(by_alias=True),
-        **base_context
+        "user_json": current_user.user_json,
+        "request": request,
+        **_BASE
     }
     return templates.TemplateResponse("patient_dashboard.html", context)
 
 @router.get("/doctor/dashboard", response_class=HTMLResponse)
 async def doctor_dashboard_page(
-    current_user: User = Depends(get_current_authenticated_user),
-    base_context: Dict[str, Any] = Depends(get_base_template_context)
+    request: Request,
+    current_user: User = Depends(require_doctor)
 ):
     """Renders the Doctor Dashboard (Protected)."""
-    if current_user.user_type != "doctor":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied.")
-    
     context = {
         "title": "Doctor Dashboard", 
         "user": current_user,
-        "user_json": current_user.model_dump_json(by_alias=True),
-        **base_context
+        "user_json": current_user.user_json,
+        "request": request,
+        **_BASE
     }
     return templates.TemplateResponse("doctor_dashboard.html", context)
 
 @router.get("/reports", response_class=HTMLResponse)
 async def reports_page(
-    current_user: User = Depends(get_current_authenticated_user),
-    base_context: Dict[str, Any] = Depends(get_base_template_context)
+    request: Request,
+    current_user: User = Depends(get_current_authenticated_user)
 ):
     """Renders the Reports (Upload/History) Page (Protected)."""
     context = {
         "title": "My Reports", 
         "user": current_user,
-        "user_json": current_user.model_dump_json(by_alias=True),
-        **base_context
+        "user_json": current_user.user_json,
+        "request": request,
+        **_BASE
     }
     return templates.TemplateResponse("reports.html", context)
 
 @router.get("/appointments", response_class=HTMLResponse)
 async def appointments_page(
-    current_user: User = Depends(get_current_authenticated_user),
-    base_context: Dict[str, Any] = Depends(get_base_template_context)
+    request: Request,
+    current_user: User = Depends(get_current_authenticated_user)
 ):
     """Renders the Appointments Booking/Viewing Page (Protected)."""
     context = {
         "title": "Appointments", 
         "user": current_user,
-        "user_json": current_user.model_dump_json(by_alias=True),
-        **base_context
+        "user_json": current_user.user_json,
+        "request": request,
+        **_BASE
     }
     return templates.TemplateResponse("appointments.html", context)
 
 
 @router.get("/ai/chat/widget", response_class=HTMLResponse)
 async def get_ai_chat_widget(
-    current_user: User = Depends(get_current_authenticated_user),
-    base_context: Dict[str, Any] = Depends(get_base_template_context)
+    request: Request,
+    current_user: User = Depends(get_current_authenticated_user)
 ):
     """Renders the partial HTML for the persistent chat widget (Protected)."""
     context = {
         "user": current_user,
-        "user_json": current_user.model_dump_json(by_alias=True),
-        **base_context
+        "user_json": current_user.user_json,
+        "request": request,
+        **_BASE
     }
     return templates.TemplateResponse("ai_chat_widget.html", context)
 
 @router.get("/user/profile", response_class=HTMLResponse)
 async def user_profile_page(
-    current_user: User = Depends(get_current_authenticated_user),
-    base_context: Dict[str, Any] = Depends(get_base_template_context)
+    request: Request,
+    current_user: User = Depends(get_current_authenticated_user)
 ):
     """Renders the dedicated Profile page for both Doctors and Patients."""
     context = {
         "title": "My Profile",
         "user": current_user,
-        "user_json": current_user.model_dump_json(by_alias=True),
-        **base_context
+        "user_json": current_user.user_json,
+        "request": request,
+        **_BASE
     }
     return templates.TemplateResponse("profile_page.html", context)
 
@@ -169,26 +194,24 @@ async def user_profile_page(
 @router.get("/doctor/patient/{patient_aarogya_id}", response_class=HTMLResponse)
 async def doctor_view_patient_page(
     patient_aarogya_id: str,
-    current_user: User = Depends(get_current_authenticated_user),
-    base_context: Dict[str, Any] = Depends(get_base_template_context)
+    request: Request,
+    current_user: User = Depends(require_doctor)
 ):
     """Renders the page for a doctor to view a specific patient's records."""
-    if current_user.user_type != "doctor":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied.")
-    
     context = {
         "title": "Patient Records", 
         "user": current_user, 
-        "user_json": current_user.model_dump_json(by_alias=True),
+        "user_json": current_user.user_json,
         "patient_aarogya_id": patient_aarogya_id, # Pass the ID to the template
-        **base_context
+        "request": request,
+        **_BASE
     }
     return templates.TemplateResponse("doctor_patient_records.html", context)
 
 @router.get("/instant-care", response_class=HTMLResponse)
 async def instant_care_page(
-    current_user: User = Depends(get_current_authenticated_user),
-    base_context: Dict[str, Any] = Depends(get_base_template_context)
+    request: Request,
+    current_user: User = Depends(get_current_authenticated_user)
 ):
     """Renders the Instant Care Console (Doctor & Patient views)."""
     
@@ -198,22 +221,24 @@ async def instant_care_page(
     context = {
         "title": "Instant Care Center",
         "user": current_user,
-        "user_json": current_user.model_dump_json(by_alias=True),
-        **base_context
+        "user_json": current_user.user_json,
+        "request": request,
+        **_BASE
     }
     return templates.TemplateResponse("instant_care.html", context)
 
 @router.get("/users/notifications", response_class=HTMLResponse)
 async def notifications_page(
-    current_user: User = Depends(get_current_authenticated_user),
-    base_context: Dict[str, Any] = Depends(get_base_template_context)
+    request: Request,
+    current_user: User = Depends(get_current_authenticated_user)
 ):
     """Renders the central notification history page."""
     context = {
         "title": "Notifications",
         "user": current_user,
-        "user_json": current_user.model_dump_json(by_alias=True),
-        **base_context
+        "user_json": current_user.user_json,
+        "request": request,
+        **_BASE
     }
     return templates.TemplateResponse("notifications.html", context)
 
@@ -1,24 +1,121 @@
 # routes/user_routes.py
 
 from fastapi import APIRouter, HTTPException, status, Depends, Response, Request, Form
-from fastapi.security import OAuth2PasswordRequestForm
-from models.schemas import User, UserCreate, SESSION_COOKIE_NAME, SESSION_EXPIRATION_MINUTES 
-from security import get_password_hash, verify_password, create_user_session, get_current_authenticated_user
+from models.schemas import User, SESSION_COOKIE_NAME, SESSION_EXPIRATION_MINUTES 
+from security import hash_password_async, verify_password_async, password_needs_rehash, create_user_session, new_user_session, save_user_session, discard_session, delete_user_session, invalidate_cached_user, get_current_authenticated_user
 from database import user_collection, notifications_collection, instant_meetings_collection
-import random
+import os
+import time
+import secrets
+import base64
+import asyncio
 from typing import Literal, Optional
 from datetime import datetime, timezone 
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 router = APIRouter()
 
-def generate_aarogya_id(user_type: Literal["patient", "doctor"]):
-    """Generates a unique AarogyaID with a 'RI' or 'RD' prefix."""
+# Session cookie settings, computed once. Patient registration has always issued
+# a shorter-lived cookie than doctor registration and login.
+_MAX_AGE = SESSION_EXPIRATION_MINUTES * 60
+_MAX_AGE_PATIENT = SESSION_EXPIRATION_MINUTES * 30
+# Whether the app is served over HTTPS is a deployment setting (set it behind a
+# TLS-terminating proxy). Unset, the request scheme decides, as it always did.
+_cookie_secure_env = os.getenv("COOKIE_SECURE")
+COOKIE_SECURE = None if _cookie_secure_env is None else _cookie_secure_env.lower() in ("1", "true", "yes")
+
+def _set_session_cookie(response: Response, request: Request, token: str, max_age: int = _MAX_AGE):
+    """Attaches the session cookie to a register/login response."""
+    secure = request.url.scheme == "https" if COOKIE_SECURE is None else COOKIE_SECURE
+    response.set_cookie(
+        SESSION_COOKIE_NAME, token, max_age=max_age, path="/", secure=secure, httponly=True, samesite="Lax"
+    )
+
+# "%m%d" of the current UTC day, re-formatted only when the day changes
+_date_part_cache = {"day": None, "value": ""}
+
+def current_date_part(now: Optional[datetime] = None) -> str:
+    day = int((now.timestamp() if now else time.time()) // 86400)
+    if _date_part_cache["day"] != day:
+        _date_part_cache["value"] = datetime.fromtimestamp(day * 86400, timezone.utc).strftime("%m%d")
+        _date_part_cache["day"] = day
+    return _date_part_cache["value"]
+
+def generate_aarogya_id(user_type: Literal["patient", "doctor"], now: Optional[datetime] = None):
+    """Generates a unique AarogyaID with an 'RP' (patient) or 'RD' (doctor) prefix."""
     prefix = "RP" if user_type == "patient" else "RD"
-    date_part = datetime.now().strftime("%m%d") 
-    random_part = str(random.randint(100000, 999999))
+    date_part = current_date_part(now)
+    # 48 random bits as 10 base32 characters: collisions are left to the unique
+    # index instead of a lookup loop
+    random_part = base64.b32encode(secrets.token_bytes(6)).decode().rstrip("=")
     return prefix +date_part+ random_part
 
+# Defaults shared by every new account. Only immutable values live here; the
+# doctor/patient lists are created per document so accounts never share them.
+_NEW_USER_DEFAULTS = {"is_public": False, "is_authorized": False}
+
+def new_user_document(user_type: Literal["patient", "doctor"], email: str, hashed_password: str, now: datetime) -> dict:
+    """
+    Builds the common part of a new user document from the shared defaults;
+    `now` (taken once per request) stamps both the aarogya_id and registration_date.
+    """
+    doc = _NEW_USER_DEFAULTS.copy()
+    doc.update(
+        _id=ObjectId(),
+        email=email,
+        hashed_password=hashed_password,
+        aarogya_id=generate_aarogya_id(user_type, now),
+        user_type=user_type,
+        doctor_list=[],
+        patient_list=[],
+        registration_date=now,
+    )
+    return doc
+
+# An aarogya_id collision needs two registrations on the same day drawing the
+# same 48 random bits, so a couple of retries is plenty.
+AAROGYA_ID_INSERT_ATTEMPTS = 3
+
+async def insert_new_user(user_doc: dict):
+    """
+    Inserts a registration in a single round-trip: email and aarogya_id
+    uniqueness are enforced by unique indexes (database.init_indexes), not pre-checks.
+    On an aarogya_id collision a fresh id is drawn and the insert retried.
+    """
+    for _ in range(AAROGYA_ID_INSERT_ATTEMPTS):
+        try:
+            await user_collection.insert_one(user_doc)
+            return
+        except DuplicateKeyError as e:
+            key_pattern = (e.details or {}).get("keyPattern", {})
+            if "email" in key_pattern:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+            if "aarogya_id" not in key_pattern:
+                break
+            user_doc["aarogya_id"] = generate_aarogya_id(user_doc["user_type"], user_doc["registration_date"])
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Registration failed, please try again.")
+
+async def insert_user_with_session(user_doc: dict) -> str:
+    """
+    Writes a new user and their first session concurrently and returns the session
+    token. The ids are generated client-side, so neither write waits on the other;
+    if either fails the other is undone so registration stays all-or-nothing.
+    """
+    session_token, session_doc = new_user_session(user_doc["_id"], user_doc["user_type"])
+    user_result, session_result = await asyncio.gather(
+        insert_new_user(user_doc), save_user_session(session_doc), return_exceptions=True
+    )
+    if isinstance(user_result, BaseException):
+        if not isinstance(session_result, BaseException):
+            await discard_session(session_token)
+        raise user_result
+    if isinstance(session_result, BaseException):
+        await user_collection.delete_one({"_id": user_doc["_id"]})
+        raise session_result
+    return session_token
+
 @router.post("/register/patient", status_code=status.HTTP_201_CREATED, tags=["Users"])
 async def register_patient(
     response: Response, 
@@ -44,18 +141,10 @@ async def register_patient(
     current_medications: Optional[str] = Form(None)
 ): 
     """Registers a new patient and logs them in immediately."""
-    user = UserCreate(email=email, password=password) # Create the object from form data
-    if await user_collection.find_one({"email": user.email}): 
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
-    
-    hashed_password = get_password_hash(user.password)
-    
-    while True:
-        new_id = generate_aarogya_id("patient")
-        if not await user_collection.find_one({"aarogya_id": new_id}): 
-            break
+    now = datetime.now(timezone.utc)
+
+    hashed_password = await hash_password_async(password)
     
-    new_user_doc_id = ObjectId()
     name_obj = {"first": first_name, "last": last_name}
     address_obj = {"street": street, "city": city, "state": state, "zip": zip_code, "country": country}
     emergency_obj = {
@@ -64,16 +153,8 @@ async def register_patient(
         "relationship": emergency_relation
     }
 
-    new_user_data = {
-        "_id": new_user_doc_id,
-        "email": user.email,
-        "hashed_password": hashed_password,
-        "aarogya_id": new_id,
-        "user_type": "patient",
-        "doctor_list": [],
-        "patient_list": [],
-        "is_public": False,
-        "is_authorized": False,
+    new_user_data = new_user_document("patient", email, hashed_password, now)
+    new_user_data.update({
         "name": name_obj,
         "phone_number": phone_number,
         "age": age,
@@ -84,23 +165,11 @@ async def register_patient(
         "medical_conditions": medical_conditions or "",
         "allergies": allergies or "",
         "current_medications": current_medications or "",
-        "registration_date": datetime.now(timezone.utc)
-    }
+    })
     
-    await user_collection.insert_one(new_user_data) 
-
-    user_id_str = str(new_user_doc_id)
-    session_token = await create_user_session(user_id=user_id_str, user_type="patient")
+    session_token = await insert_user_with_session(new_user_data)
     
-    response.set_cookie(
-        key=SESSION_COOKIE_NAME,
-        value=session_token,
-        httponly=True,
-        max_age=SESSION_EXPIRATION_MINUTES * 30,
-        path="/",
-        secure=request.url.scheme == "https",
-        samesite="Lax"
-    )
+    _set_session_cookie(response, request, session_token, _MAX_AGE_PATIENT)
 
     # Return a simple, JSON-safe dictionary instead of a Pydantic model
     return {
@@ -133,18 +202,10 @@ async def register_doctor(
     country: str = Form(...)
 ): 
     """Registers a new doctor and logs them in immediately."""
-    user = UserCreate(email=email, password=password) # Create the object from form data
-    if await user_collection.find_one({"email": user.email}):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
+    now = datetime.now(timezone.utc)
 
-    hashed_password = get_password_hash(user.password)
-    
-    while True:
-        new_id = generate_aarogya_id("doctor")
-        if not await user_collection.find_one({"aarogya_id": new_id}): 
-            break
+    hashed_password = await hash_password_async(password)
     
-    new_user_doc_id = ObjectId()
     name_obj = {"first": first_name, "last": last_name}
     emergency_obj = {
         "name": emergency_name,
@@ -159,16 +220,8 @@ async def register_doctor(
         "country": country
     }
     
-    new_user_data = {
-        "_id": new_user_doc_id,
-        "email": user.email,
-        "hashed_password": hashed_password,
-        "aarogya_id": new_id,
-        "user_type": "doctor",
-        "is_public": False,      
-        "is_authorized": False,
-        "doctor_list": [], 
-        "patient_list": [],
+    new_user_data = new_user_document("doctor", email, hashed_password, now)
+    new_user_data.update({
         "name": name_obj,
         "phone_number": phone_number,
         "age": age,               
@@ -177,23 +230,11 @@ async def register_doctor(
         "blood_group": blood_group,    
         "emergency_contact": emergency_obj,
         "specialization": specialization,
-        "registration_date": datetime.now(timezone.utc)
-    }
+    })
 
-    await user_collection.insert_one(new_user_data) 
-
-    user_id_str = str(new_user_doc_id)
-    session_token = await create_user_session(user_id=user_id_str, user_type="doctor")
+    session_token = await insert_user_with_session(new_user_data)
     
-    response.set_cookie(
-        key=SESSION_COOKIE_NAME,
-        value=session_token,
-        httponly=True,
-        max_age=SESSION_EXPIRATION_MINUTES * 60,
-        path="/",
-        secure=request.url.scheme == "https",
-        samesite="Lax"
-    )
+    _set_session_cookie(response, request, session_token)
     
     # Return a simple, JSON-safe dictionary instead of a Pydantic model
     return {
@@ -208,32 +249,31 @@ async def login_for_access_token(
     # FIX APPLIED: Move arguments without defaults (Response, Request) to the beginning.
     response: Response, 
     request: Request,
-    form_data: OAuth2PasswordRequestForm = Depends()
+    # Plain form fields rather than the OAuth2PasswordRequestForm class dependency:
+    # FastAPI runs a class's sync __init__ in the threadpool on every login
+    username: str = Form(...),
+    password: str = Form(...)
 ):
     """Logs in a user and sets the session cookie."""
-    user_data = await user_collection.find_one({"email": form_data.username})
+    user_data = await user_collection.find_one({"email": username})
     
-    if not user_data or not verify_password(form_data.password, user_data["hashed_password"]):
+    if not user_data or not await verify_password_async(password, user_data["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user_id_str = str(user_data["_id"])
     user_type = user_data["user_type"]
 
-    session_token = await create_user_session(user_id=user_id_str, user_type=user_type)
+    session_token = await create_user_session(user_id=user_data["_id"], user_type=user_type)
+
+    # Upgrade legacy bcrypt (or outdated argon2) hashes now that we have the plaintext
+    if password_needs_rehash(user_data["hashed_password"]):
+        new_hash = await hash_password_async(password)
+        await user_collection.update_one({"_id": user_data["_id"]}, {"$set": {"hashed_password": new_hash}})
     
-    response.set_cookie(
-        key=SESSION_COOKIE_NAME,
-        value=session_token,
-        httponly=True,
-        max_age=SESSION_EXPIRATION_MINUTES * 60,
-        path="/",
-        secure=request.url.scheme == "https",
-        samesite="Lax"
-    )
+    _set_session_cookie(response, request, session_token)
 
     return {
         "message": "Login successful. Session cookie set.", 
@@ -243,6 +283,13 @@ async def login_for_access_token(
 
 # In routes/user_routes.py
 
+# Fields editable through /update_profile, echoed back after the update
+PROFILE_PROJECTION = {
+    "_id": 0, "name": 1, "phone_number": 1, "age": 1, "gender": 1, "blood_group": 1,
+    "address": 1, "emergency_contact": 1, "medical_conditions": 1, "allergies": 1,
+    "current_medications": 1, "specialization": 1
+}
+
 @router.post("/update_profile", tags=["Users"])
 async def update_user_profile(
     current_user: User = Depends(get_current_authenticated_user),
@@ -271,10 +318,10 @@ async def update_user_profile(
     
     print(f"DEBUG: Received update for {current_user.email}")
     
-    name_obj = {"first": first_name, "last": last_name}
-    
+    # Dotted paths update the name in place, leaving any other keys under it alone
     update_data = {
-        "name": name_obj,
+        "name.first": first_name,
+        "name.last": last_name,
         "phone_number": phone_number
     }
 
@@ -286,39 +333,38 @@ async def update_user_profile(
         if allergies is not None: update_data["allergies"] = allergies
         if current_medications is not None: update_data["current_medications"] = current_medications
 
-        if street or city or state or zip_code or country:
-            address_obj = {
-                "street": street or "",
-                "city": city or "",
-                "state": state or "",
-                "zip": zip_code or "",
-                "country": country or ""
-            }
-            update_data["address"] = address_obj
+        address_fields = {"street": street, "city": city, "state": state, "zip": zip_code, "country": country}
+        if any(address_fields.values()):
+            update_data["address"] = {k: v or "" for k, v in address_fields.items()}
         
         # Handle Emergency Contact Update
-        if emergency_name or emergency_phone or emergency_relation:
-            emergency_obj = {
-                "name": emergency_name or "",
-                "phone": emergency_phone or "",
-                "relationship": emergency_relation or ""
-            }
-            update_data["emergency_contact"] = emergency_obj
+        emergency_fields = {"name": emergency_name, "phone": emergency_phone, "relationship": emergency_relation}
+        if any(emergency_fields.values()):
+            update_data["emergency_contact"] = {k: v or "" for k, v in emergency_fields.items()}
 
     elif current_user.user_type == "doctor":
         if specialization:
             update_data["specialization"] = specialization
 
-    from bson import ObjectId
-    result = await user_collection.update_one(
+    # Returns the updated profile fields so the client doesn't need a second fetch
+    updated_profile = await user_collection.find_one_and_update(
         {"_id": ObjectId(current_user.id)},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection=PROFILE_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
 
-    if result.matched_count == 0:
+    if updated_profile is None:
         raise HTTPException(status_code=404, detail="User not found.")
 
-    return {"message": "Profile updated successfully."}
+    invalidate_cached_user(current_user.email)
+    return {"message": "Profile updated successfully.", "user": updated_profile}
+
+@router.get("/me", tags=["Users"])
+async def get_me(current_user: User = Depends(get_current_authenticated_user)):
+    """Returns the current user as JSON for client-side state."""
+    # Same payload as the pages' embedded user_json, reusing its cached serialization
+    return Response(content=current_user.user_json, media_type="application/json")
 
 @router.get("/notifications/data")
 async def get_notifications(current_user=Depends(get_current_authenticated_user)):
@@ -354,13 +400,12 @@ async def mark_notification_as_read(
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/logout")
-async def logout_user(response: Response):
+async def logout_user(request: Request, response: Response):
     """
-    Logs the user out by deleting the session cookie.
+    Logs the user out: deletes the session server-side (and from the auth cache)
+    and removes the session cookie.
     """
-    # The key is to tell the browser to delete the cookie.
-    # The cookie name ('session_token') must match the one you set during login.
-    response.delete_cookie(key="session_token")
+    await delete_user_session(request, response)
     
     # You can return a success message...
     return {"message": "Successfully logged out"}
\ No newline at end of file
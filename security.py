@@ -1,53 +1,197 @@
 # security.py
 
 import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 import os
+import hmac
+import hashlib
+import time
 import secrets
-from datetime import datetime, timedelta, timezone
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from cachetools import TTLCache
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status, Request, Response
 from bson import ObjectId
+from pymongo import UpdateOne, WriteConcern
 from typing import Optional
 
 # UPDATED IMPORTS: Use async database client and new session/user schemas
-from models.schemas import User, UserSession, SESSION_COOKIE_NAME, SESSION_EXPIRATION_MINUTES
-from database import user_collection, db 
+from models.schemas import User, UserSession, SESSION_COOKIE_NAME
+from database import db 
 
 load_dotenv()
 
 # --- Password Utilities (Keep as is) ---
+# New hashes are argon2id, by default the OWASP interactive profile (46 MiB, t=2, p=1);
+# the cost can be tuned per deployment. Accounts holding a legacy bcrypt hash, or
+# one made with different parameters, are upgraded on their next successful
+# login (see password_needs_rehash).
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "2"))
+ARGON2_MEMORY_COST_KIB = int(os.getenv("ARGON2_MEMORY_COST_KIB", str(46 * 1024)))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+_password_hasher = PasswordHasher(
+    time_cost=ARGON2_TIME_COST, memory_cost=ARGON2_MEMORY_COST_KIB, parallelism=ARGON2_PARALLELISM
+)
+
+def _is_bcrypt_hash(hashed_password: str) -> bool:
+    return hashed_password.startswith("$2")
+
+def _check_password(plain_password: str, hashed_password: str) -> bool:
+    if _is_bcrypt_hash(hashed_password):
+        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    try:
+        return _password_hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True for bcrypt hashes and argon2 hashes made with older parameters."""
+    return _is_bcrypt_hash(hashed_password) or _password_hasher.check_needs_rehash(hashed_password)
+
+# Recent verification results, keyed by an HMAC of (password, stored hash) so the
+# cache never holds plaintext. Mismatches expire quickly so repeated wrong
+# guesses still pay the full hashing cost.
+VERIFY_CACHE_MAX = 4096
+VERIFY_CACHE_TTL = 300
+VERIFY_CACHE_FAILURE_TTL = 2
+_VERIFY_PEPPER = os.getenv("VERIFY_PEPPER", "").encode() or secrets.token_bytes(32)
+_verify_cache: "OrderedDict[bytes, tuple[bool, float]]" = OrderedDict()
+_verify_cache_lock = threading.Lock() # verify_password runs in worker threads
+
 def verify_password(plain_password: str, hashed_password:str) -> bool:
     """Compares a plain text password with a stored hash."""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    key = hmac.new(_VERIFY_PEPPER, plain_password.encode('utf-8') + b"\0" + hashed_password.encode('utf-8'), "sha256").digest()
+    now = time.monotonic()
+    with _verify_cache_lock:
+        cached = _verify_cache.get(key)
+        if cached is not None:
+            result, expires = cached
+            if expires > now:
+                _verify_cache.move_to_end(key)
+                return result
+            del _verify_cache[key]
+
+    result = _check_password(plain_password, hashed_password)
+
+    ttl = VERIFY_CACHE_TTL if result else VERIFY_CACHE_FAILURE_TTL
+    with _verify_cache_lock:
+        _verify_cache[key] = (result, now + ttl)
+        if len(_verify_cache) > VERIFY_CACHE_MAX:
+            _verify_cache.popitem(last=False)
+    return result
 
 def get_password_hash(password: str) -> str:
-    """Returns a secure bcrypt hash."""
-    hashed_bytes = bcrypt.hashpw(password.encode('utf-8'),bcrypt.gensalt())
-    return hashed_bytes.decode('utf-8')
+    """Returns a secure argon2id hash."""
+    return _password_hasher.hash(password)
+
+# Hashing gets its own small pool: libargon2 and bcrypt release the GIL, so threads
+# run in parallel, and the cap keeps a registration burst from oversubscribing
+# the CPU (or holding more than a few 46 MiB argon2 buffers at once).
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+_hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_hash_pool, verify_password, plain_password, hashed_password)
 
 
 # --- Session Management Functions ---
+# Sessions are cheap to recreate (worst case: log in again), so their writes are
+# acknowledged by the primary without waiting for the journal.
+_sessions_collection = db.get_collection("sessions", write_concern=WriteConcern(w=1, j=False))
+
 def get_sessions_collection():
     """Returns the Motor sessions collection."""
-    return db.get_collection("sessions")
+    return _sessions_collection
 
-async def create_user_session(user_id: str, user_type: str) -> str:
-    """Creates a session document, saves it to DB, and returns the secure random token."""
-    sessions_collection = get_sessions_collection()
-    session_token = secrets.token_hex(32)
+def session_token_hash(session_token: str) -> str:
+    """The form a session token is stored and looked up in; a leaked sessions
+    collection therefore holds no usable cookies."""
+    return hashlib.sha256(session_token.encode()).hexdigest()
+
+def new_user_session(user_id: str | ObjectId, user_type: str) -> tuple[str, dict]:
+    """Builds a session document in memory and returns (token, document) without saving it."""
+    if isinstance(user_id, ObjectId):
+        # Same 24-char hex as str(ObjectId), without going through its __str__
+        user_id = user_id.binary.hex()
+    session_token = secrets.token_urlsafe(32)
     
-    session = UserSession(token=session_token, user_id=user_id, user_type=user_type)
-    session_dict = session.model_dump(mode='json', exclude={'id'})
+    session = UserSession(token_hash=session_token_hash(session_token), user_id=user_id, user_type=user_type)
+    # Datetimes stay native so the expires_at TTL index (database.init_indexes) applies
+    return session_token, session.model_dump(exclude={'id'})
 
+async def save_user_session(session_dict: dict):
+    """Persists a document built by new_user_session."""
+    sessions_collection = get_sessions_collection()
     try:
         insert_result = await sessions_collection.insert_one(session_dict)
         if not insert_result.inserted_id:
              raise Exception("Failed to insert session document")
-        return session_token
     except Exception as e:
-        print(f"Error creating session document for user {user_id}: {e}")
+        print(f"Error creating session document for user {session_dict['user_id']}: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create session document")
 
+async def create_user_session(user_id: str | ObjectId, user_type: str) -> str:
+    """Creates a session document, saves it to DB, and returns the secure random token."""
+    session_token, session_dict = new_user_session(user_id, user_type)
+    await save_user_session(session_dict)
+    return session_token
+
+
+# Short-lived per-process caches for the auth path: token -> UserSession and
+# user id -> User. A hit skips the session lookup, the last_active write and the
+# user lookup; last_active is refreshed once per cache window instead of per request.
+# Invalidation (logout, profile/connection changes) only reaches the worker that
+# handled it: on other workers a revoked session keeps authenticating for up to
+# SESSION_CACHE_TTL seconds, and a changed user is served stale for up to
+# AUTH_CACHE_TTL. Sessions get the shorter window for that reason.
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "30"))
+SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", "10"))
+AUTH_CACHE_MAX = int(os.getenv("AUTH_CACHE_MAX", "10000"))
+_session_cache = TTLCache(maxsize=AUTH_CACHE_MAX, ttl=SESSION_CACHE_TTL)
+_user_cache = TTLCache(maxsize=AUTH_CACHE_MAX, ttl=AUTH_CACHE_TTL)
+# email -> user id of the entries in _user_cache, so invalidation is a lookup
+_cached_user_ids = TTLCache(maxsize=AUTH_CACHE_MAX, ttl=AUTH_CACHE_TTL)
+
+# The password hash is only needed at login; every other user lookup leaves it
+# in the database rather than shipping and caching it per request.
+USER_PUBLIC_PROJECTION = {"hashed_password": 0}
+
+def invalidate_cached_user(email: str):
+    """Drops the cached User for `email` after its document is updated."""
+    user_id = _cached_user_ids.pop(email, None)
+    if user_id is not None:
+        _user_cache.pop(user_id, None)
+
+# last_active is a heartbeat: updates are buffered here (session id -> latest
+# timestamp) and written in one unordered bulk_write every few seconds.
+LAST_ACTIVE_FLUSH_SECONDS = float(os.getenv("LAST_ACTIVE_FLUSH_SECONDS", "5"))
+_pending_last_active: dict[ObjectId, datetime] = {}
+
+async def flush_last_active():
+    """Writes the buffered last_active timestamps in a single round-trip."""
+    if not _pending_last_active:
+        return
+    batch = _pending_last_active.copy()
+    _pending_last_active.clear()
+    ops = [UpdateOne({"_id": session_id}, {"$set": {"last_active": ts}}) for session_id, ts in batch.items()]
+    try:
+        await get_sessions_collection().bulk_write(ops, ordered=False)
+    except Exception as e:
+        print(f"Error flushing session activity: {e}")
+
+async def last_active_flusher():
+    """Background task started with the app; flushes last_active periodically."""
+    while True:
+        await asyncio.sleep(LAST_ACTIVE_FLUSH_SECONDS)
+        await flush_last_active()
 
 async def get_current_session(request: Request) -> Optional[UserSession]:
     """Retrieves and validates the session from the cookie and database."""
@@ -55,9 +199,15 @@ async def get_current_session(request: Request) -> Optional[UserSession]:
     if not session_token:
         return None
 
+    session = _session_cache.get(session_token)
+    if session is not None:
+        if session.expires_at >= datetime.now(timezone.utc):
+            return session
+        _session_cache.pop(session_token, None)
+
     sessions_collection = get_sessions_collection()
     try:
-        session_doc = await sessions_collection.find_one({"token": session_token})
+        session_doc = await sessions_collection.find_one({"token_hash": session_token_hash(session_token)})
 
         if session_doc:
             if '_id' in session_doc and isinstance(session_doc['_id'], ObjectId):
@@ -66,15 +216,13 @@ async def get_current_session(request: Request) -> Optional[UserSession]:
             session = UserSession(**session_doc)
             now_utc = datetime.now(timezone.utc)
 
+            # Expired documents are removed by the TTL index; until its sweep runs, ignore them
             if session.expires_at < now_utc:
-                await sessions_collection.delete_one({"_id": ObjectId(session.id)})
                 return None
 
-            # Update activity timestamp (sliding window)
-            await sessions_collection.update_one(
-                {"_id": ObjectId(session.id)},
-                {"$set": {"last_active": datetime.now(timezone.utc)}}
-            )
+            # Update activity timestamp (sliding window), written by last_active_flusher
+            _pending_last_active[ObjectId(session.id)] = now_utc
+            _session_cache[session_token] = session
             return session
         else:
              return None
@@ -84,13 +232,17 @@ async def get_current_session(request: Request) -> Optional[UserSession]:
         return None
 
 
+async def discard_session(session_token: str):
+    """Deletes a session by its raw token, from the DB and the auth cache."""
+    _session_cache.pop(session_token, None)
+    await get_sessions_collection().delete_one({"token_hash": session_token_hash(session_token)})
+
 async def delete_user_session(request: Request, response: Response):
     """Deletes the session from the DB and removes the cookie."""
     session_token = request.cookies.get(SESSION_COOKIE_NAME)
     if session_token:
-        sessions_collection = get_sessions_collection()
         try:
-            await sessions_collection.delete_one({"token": session_token})
+            await discard_session(session_token)
         except Exception as e:
             print(f"Error deleting session from DB: {e}")
 
@@ -100,6 +252,11 @@ async def delete_user_session(request: Request, response: Response):
 # --- Authentication Dependency ---
 async def get_current_authenticated_user(request: Request):
     """Fetches the authenticated User object based on the session cookie."""
+    # Resolved at most once per request, however many dependencies ask for it
+    cached_user = getattr(request.state, "user", None)
+    if cached_user is not None:
+        return cached_user
+
     session: Optional[UserSession] = await get_current_session(request)
 
     if not session:
@@ -110,10 +267,15 @@ async def get_current_authenticated_user(request: Request):
         )
 
     user_id_str = session.user_id 
+
+    cached_user = _user_cache.get(user_id_str)
+    if cached_user is not None:
+        request.state.user = cached_user
+        return cached_user
     
     try:
         # Fetch the full user document from the 'users' collection (now using Motor)
-        user_doc = await db.users.find_one({"_id": ObjectId(user_id_str)})
+        user_doc = await db.users.find_one({"_id": ObjectId(user_id_str)}, USER_PUBLIC_PROJECTION)
     except Exception as e:
         print(f"Error fetching user {user_id_str} from users collection: {e}")
         user_doc = None
@@ -129,7 +291,20 @@ async def get_current_authenticated_user(request: Request):
     # security.py line 129
     if '_id' in user_doc:
         user_doc['_id'] = str(user_doc['_id'])
-    return User(**user_doc)
+    request.state.user = _user_cache[user_id_str] = User.model_validate(user_doc)
+    _cached_user_ids[request.state.user.email] = user_id_str
+    return request.state.user
+
+def require_role(role: str):
+    """
+    Dependency factory: resolves the authenticated user and rejects (403) anyone
+    whose user_type isn't `role`, so handlers don't repeat the check inline.
+    """
+    async def role_dependency(current_user: User = Depends(get_current_authenticated_user)) -> User:
+        if current_user.user_type != role:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied.")
+        return current_user
+    return role_dependency
 
 async def get_optional_user(request: Request) -> Optional[User]:
     """
@@ -0,0 +1,26 @@
+# templating.py
+
+import os
+import tempfile
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+# Compiled templates are persisted here, so a restarted worker loads bytecode
+# instead of re-parsing every template.
+JINJA_CACHE_DIR = os.getenv("JINJA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "aarogya_jinja_cache"))
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+
+# Templates don't change in production; set TEMPLATES_AUTO_RELOAD=true in development
+# to pick up edits (otherwise every render stat()s the template files).
+TEMPLATES_AUTO_RELOAD = os.getenv("TEMPLATES_AUTO_RELOAD", "false").lower() == "true"
+
+env = Environment(
+    loader=FileSystemLoader("templates"),
+    autoescape=True,  # same as Starlette's default environment
+    bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR),
+    auto_reload=TEMPLATES_AUTO_RELOAD,
+    cache_size=1000,
+)
+
+# Shared by every router that renders HTML
+templates = Jinja2Templates(env=env)
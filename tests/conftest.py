@@ -0,0 +1,64 @@
+# tests/conftest.py
+
+import os
+
+# database.py refuses to import without it; the Motor client connects lazily,
+# so no server is needed as long as the tests swap in FakeCollection.
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    """The handful of query operators the route helpers use."""
+    for field, cond in query.items():
+        value = doc.get(field)
+        if isinstance(cond, dict):
+            for op, arg in cond.items():
+                if op == "$exists" and (field in doc) != arg:
+                    return False
+                if op == "$in" and value not in arg:
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+                if op == "$lte" and (value is None or value > arg):
+                    return False
+        elif value != cond:
+            return False
+    return True
+
+
+class FakeCollection:
+    """In-memory stand-in for the Motor collection methods the helpers call."""
+
+    def __init__(self, *docs):
+        self.docs = [dict(d) for d in docs]
+        self.name = "fake"
+
+    def find(self, query: dict):
+        return [d for d in self.docs if _matches(d, query)]
+
+    async def find_one(self, query: dict, projection=None):
+        found = self.find(query)
+        return dict(found[0]) if found else None
+
+    async def insert_one(self, doc: dict):
+        self.docs.append(dict(doc))
+
+    async def find_one_and_update(self, query: dict, update: dict, projection=None, return_document=False):
+        for doc in self.find(query):
+            for field, step in update.get("$inc", {}).items():
+                doc[field] = doc.get(field, 0) + step
+            return dict(doc)
+        return None
+
+    async def count_documents(self, query: dict, limit: int = 0):
+        count = len(self.find(query))
+        return min(count, limit) if limit else count
+
+    async def delete_one(self, query: dict):
+        found = self.find(query)
+        if found:
+            self.docs.remove(found[0])
+
+        class Result:
+            deleted_count = len(found[:1])
+        return Result()
@@ -0,0 +1,68 @@
+# tests/test_pdf_service.py
+
+import os
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+pytest.importorskip("fpdf")
+fitz = pytest.importorskip("fitz")
+
+from app.services import pdf_service
+from app.services.pdf_service import generate_fpdf, extract_text, extract_text_async, run_in_cpu_pool
+
+
+def _pdf_text(pdf_bytes: bytes) -> str:
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return "".join(page.get_text() for page in doc)
+
+
+def _make_pdf(pages: int) -> bytes:
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"page {i}")
+    return doc.tobytes()
+
+
+def test_consecutive_reports_with_different_characters():
+    # Font subsetting must not leak between renders: the second report uses
+    # glyphs the first one never did.
+    first = generate_fpdf("abc")
+    second = generate_fpdf("xyz Blood pressure 120/80, temp 38.5")
+
+    assert "abc" in _pdf_text(first)
+    assert "xyz Blood pressure 120/80" in _pdf_text(second)
+
+
+def test_repeated_render_of_same_text():
+    text = "Hemoglobin 13.5 g/dL"
+    first, second = generate_fpdf(text), generate_fpdf(text)
+
+    assert _pdf_text(first).strip() == text
+    assert _pdf_text(second).strip() == text
+
+
+def test_extract_text_async_small_and_split_pdfs():
+    large_pages = pdf_service.PARALLEL_PAGE_THRESHOLD + 3
+    small, large = _make_pdf(2), _make_pdf(large_pages)
+
+    async def run():
+        return await asyncio.gather(
+            extract_text_async(small, "application/pdf"),
+            extract_text_async(large, "application/pdf"),
+        )
+
+    small_text, large_text = asyncio.run(run())
+    assert "page 1" in small_text
+    assert all(f"page {i}" in large_text for i in range(large_pages))
+
+
+def test_cpu_pool_recovers_after_a_worker_dies():
+    async def run():
+        # os._exit kills the worker: the retry on the rebuilt pool dies too
+        with pytest.raises(BrokenProcessPool):
+            await run_in_cpu_pool(os._exit, 1)
+        return await run_in_cpu_pool(extract_text, b"still working", "text/plain")
+
+    assert asyncio.run(run()) == "still working"
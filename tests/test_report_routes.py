@@ -0,0 +1,67 @@
+# tests/test_report_routes.py
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+pytest.importorskip("cachetools")
+pytest.importorskip("fitz")
+pytest.importorskip("google.generativeai")
+
+from bson import ObjectId
+
+from conftest import FakeCollection
+from routes import report_routes
+from routes.report_routes import claim_existing_content, release_content
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """Swaps both collections for in-memory fakes; returns (contents, reports)."""
+    contents, reports = FakeCollection(), FakeCollection()
+    monkeypatch.setattr(report_routes, "report_contents_collection", contents)
+    monkeypatch.setattr(report_routes, "reports_collection", reports)
+    report_routes._content_cache.clear()
+    return contents, reports
+
+
+def test_claim_takes_a_reference_on_matching_content(store):
+    contents, _ = store
+    content_oid = ObjectId()
+    contents.docs.append({"_id": content_oid, "sha256": "abc", "ref_count": 1})
+
+    assert asyncio.run(claim_existing_content("missing")) is None
+    assert asyncio.run(claim_existing_content("abc"))["_id"] == content_oid
+    assert contents.docs[0]["ref_count"] == 2
+
+
+def test_release_keeps_shared_content_until_the_last_reference(store):
+    contents, _ = store
+    content_oid = ObjectId()
+    contents.docs.append({"_id": content_oid, "content_text": "text", "ref_count": 2})
+    report_routes._content_cache[content_oid] = contents.docs[0]
+
+    asyncio.run(release_content(content_oid, ObjectId()))
+    assert contents.docs[0]["ref_count"] == 1
+    assert content_oid in report_routes._content_cache
+
+    asyncio.run(release_content(content_oid, ObjectId()))
+    assert not contents.docs
+    assert content_oid not in report_routes._content_cache
+
+
+def test_release_counts_references_on_legacy_content(store):
+    contents, reports = store
+    content_oid, report_oid, other_oid = ObjectId(), ObjectId(), ObjectId()
+    # Stored before ref counting: no ref_count, content_id as a hex string
+    contents.docs.append({"_id": content_oid, "content_text": "text"})
+    reports.docs.append({"_id": other_oid, "content_id": str(content_oid)})
+
+    asyncio.run(release_content(content_oid, report_oid))
+    assert contents.docs, "still referenced by another report"
+
+    reports.docs.clear()
+    asyncio.run(release_content(content_oid, other_oid))
+    assert not contents.docs
@@ -0,0 +1,61 @@
+# tests/test_security.py
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+pytest.importorskip("argon2")
+
+import security
+
+
+@pytest.fixture
+def checks(monkeypatch):
+    """Counts real hash checks; the stored "hash" is simply the password."""
+    calls = []
+
+    def check(plain, hashed):
+        calls.append(plain)
+        return plain == hashed
+
+    monkeypatch.setattr(security, "_check_password", check)
+    monkeypatch.setattr(security, "_verify_cache", security.OrderedDict())
+    return calls
+
+
+def test_verify_cache_skips_the_hash_for_a_repeat(checks):
+    assert security.verify_password("secret", "secret")
+    assert security.verify_password("secret", "secret")
+    assert checks == ["secret"]
+
+
+def test_verify_cache_is_keyed_by_password_and_hash(checks):
+    assert security.verify_password("secret", "secret")
+    assert not security.verify_password("wrong", "secret")
+    # A changed stored hash must be checked again, not served from the cache
+    assert not security.verify_password("secret", "rotated")
+    assert checks == ["secret", "wrong", "secret"]
+
+
+def test_failed_verifications_expire_quickly(checks, monkeypatch):
+    monkeypatch.setattr(security, "VERIFY_CACHE_FAILURE_TTL", 0)
+    assert not security.verify_password("wrong", "secret")
+    assert not security.verify_password("wrong", "secret")
+    assert checks == ["wrong", "wrong"]
+
+
+def test_verify_cache_is_bounded(checks, monkeypatch):
+    monkeypatch.setattr(security, "VERIFY_CACHE_MAX", 2)
+    for password in ("a", "b", "c"):
+        security.verify_password(password, password)
+    assert len(security._verify_cache) == 2
+
+    # "a" was evicted first, so it is checked again
+    security.verify_password("a", "a")
+    assert checks == ["a", "b", "c", "a"]
+
+
+def test_real_hashes_round_trip():
+    hashed = security.get_password_hash("correct horse")
+    assert security.verify_password("correct horse", hashed)
+    assert not security.verify_password("battery staple", hashed)
@@ -0,0 +1,87 @@
+# tests/test_user_routes.py
+
+import asyncio
+import string
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("motor")
+pytest.importorskip("fastapi")
+pytest.importorskip("argon2")
+
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+
+from conftest import FakeCollection
+from routes import user_routes
+from routes.user_routes import generate_aarogya_id, new_user_document, insert_new_user
+
+
+NOW = datetime(2026, 3, 7, 15, 30, tzinfo=timezone.utc)
+
+
+def _duplicate(field: str) -> DuplicateKeyError:
+    return DuplicateKeyError("E11000 duplicate key", 11000, {"keyPattern": {field: 1}})
+
+
+class CollidingUsers(FakeCollection):
+    """Rejects the first inserts with the given duplicate-key errors."""
+
+    def __init__(self, *errors):
+        super().__init__()
+        self.errors = list(errors)
+        self.attempted_ids = []
+
+    async def insert_one(self, doc):
+        self.attempted_ids.append(doc["aarogya_id"])
+        if self.errors:
+            raise self.errors.pop(0)
+        await super().insert_one(doc)
+
+
+def test_generate_aarogya_id_format():
+    patient_id = generate_aarogya_id("patient", NOW)
+    doctor_id = generate_aarogya_id("doctor", NOW)
+
+    assert patient_id.startswith("RP0307") and doctor_id.startswith("RD0307")
+    # 48 random bits are exactly 10 unpadded base32 characters
+    assert len(patient_id) == 16
+    assert set(patient_id[6:]) <= set(string.ascii_uppercase + "234567")
+
+
+def test_generate_aarogya_id_is_random():
+    assert len({generate_aarogya_id("patient", NOW) for _ in range(1000)}) == 1000
+
+
+def test_insert_retries_with_a_fresh_aarogya_id(monkeypatch):
+    users = CollidingUsers(_duplicate("aarogya_id"))
+    monkeypatch.setattr(user_routes, "user_collection", users)
+    doc = new_user_document("patient", "a@example.com", "hash", NOW)
+
+    asyncio.run(insert_new_user(doc))
+
+    first, second = users.attempted_ids
+    assert first != second and second.startswith("RP0307")
+    assert [d["aarogya_id"] for d in users.docs] == [second]
+
+
+def test_insert_reports_a_taken_email(monkeypatch):
+    users = CollidingUsers(_duplicate("email"))
+    monkeypatch.setattr(user_routes, "user_collection", users)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(insert_new_user(new_user_document("doctor", "a@example.com", "hash", NOW)))
+    assert exc.value.status_code == 400
+    assert len(users.attempted_ids) == 1
+
+
+def test_insert_gives_up_after_repeated_collisions(monkeypatch):
+    attempts = user_routes.AAROGYA_ID_INSERT_ATTEMPTS
+    users = CollidingUsers(*(_duplicate("aarogya_id") for _ in range(attempts)))
+    monkeypatch.setattr(user_routes, "user_collection", users)
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(insert_new_user(new_user_document("patient", "a@example.com", "hash", NOW)))
+    assert exc.value.status_code == 500
+    assert len(users.attempted_ids) == attempts and not users.docs